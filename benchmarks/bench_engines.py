@@ -0,0 +1,187 @@
+"""
+Compare the thread-per-connection and asyncio server engines.
+
+For each engine a server process is started on a free port, then:
+  1. N idle connections are opened and joined; the server's RSS and
+     thread count are read from /proc (Linux only).
+  2. M concurrent bot matches play full games for a fixed duration and
+     the number of resolved moves per second is reported.
+
+Usage:
+    python benchmarks/bench_engines.py --idle 1000 --matches 50 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from protocol import FrameDecoder, encode  # noqa: E402
+
+SHIPS = [
+    {"start": "A1", "end": "B1"},
+    {"start": "A3", "end": "C3"},
+    {"start": "A5", "end": "D5"},
+    {"start": "A7", "end": "E7"},
+]
+TARGETS = [chr(ord("A") + col) + str(row + 1) for row in range(10) for col in range(10)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def read_proc_status(pid: int) -> dict:
+    status = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                status[key] = value.strip()
+    except OSError:
+        pass
+    return status
+
+
+def start_server(engine: str, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "server.py", "--engine", engine, "--port", str(port)],
+        cwd=SRC_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"{engine} server did not start")
+
+
+class Bot:
+    """
+    Minimal headless player: fires at every cell in order until the game ends.
+    """
+
+    def __init__(self, port: int, name: str, stats: dict):
+        self.port = port
+        self.name = name
+        self.stats = stats
+
+    async def send(self, writer, payload: dict) -> None:
+        writer.write(encode(payload))
+        await writer.drain()
+
+    async def play(self, stop_at: float) -> None:
+        while time.time() < stop_at:
+            reader, writer = await asyncio.open_connection("localhost", self.port)
+            try:
+                await self.play_game(reader, writer, stop_at)
+            finally:
+                writer.close()
+
+    async def play_game(self, reader, writer, stop_at: float) -> None:
+        await self.send(writer, {"type": "join", "name": self.name})
+        await self.send(writer, {"type": "place", "ships": SHIPS})
+        await self.send(writer, {"type": "ready"})
+
+        shots = iter(TARGETS)
+        decoder = FrameDecoder()
+        while time.time() < stop_at:
+            try:
+                data = await asyncio.wait_for(reader.read(4096), max(0.01, stop_at - time.time()))
+            except asyncio.TimeoutError:
+                return
+            if not data:
+                return
+            for message in decoder.feed(data):
+                msg_type = message.get("type")
+                if msg_type == "turn":
+                    writer.write(encode({"type": "move", "coord": next(shots)}))
+                elif msg_type == "result":
+                    self.stats["moves"] += 1
+                elif msg_type == "gameover":
+                    self.stats["games"] += 1
+                    return
+
+
+async def run_matches(port: int, matches: int, duration: float) -> dict:
+    stats = {"moves": 0, "games": 0}
+    stop_at = time.time() + duration
+    bots = []
+    for i in range(matches):
+        # Join in pairs so each pair lands in the same match
+        bots.append(Bot(port, f"BotA{i}", stats).play(stop_at))
+        bots.append(Bot(port, f"BotB{i}", stats).play(stop_at))
+    started = time.time()
+    await asyncio.gather(*bots, return_exceptions=True)
+    stats["elapsed"] = time.time() - started
+    return stats
+
+
+def hold_idle(port: int, count: int) -> list:
+    sockets = []
+    for i in range(count):
+        s = socket.create_connection(("localhost", port))
+        s.sendall(encode({"type": "join", "name": f"Idle{i}"}))
+        sockets.append(s)
+    return sockets
+
+
+def bench_engine(engine: str, idle: int, matches: int, duration: float) -> dict:
+    port = free_port()
+    proc = start_server(engine, port)
+    try:
+        base = read_proc_status(proc.pid)
+        sockets = hold_idle(port, idle)
+        time.sleep(1.0)
+        held = read_proc_status(proc.pid)
+        for s in sockets:
+            s.close()
+        time.sleep(0.5)
+
+        stats = asyncio.run(run_matches(port, matches, duration))
+    finally:
+        proc.kill()
+        proc.wait()
+
+    return {
+        "engine": engine,
+        "rss_base": base.get("VmRSS", "?"),
+        "rss_held": held.get("VmRSS", "?"),
+        "threads_held": held.get("Threads", "?"),
+        "moves_per_sec": stats["moves"] / stats["elapsed"],
+        "games": stats["games"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle", type=int, default=500, help="idle connections to hold")
+    parser.add_argument("--matches", type=int, default=20, help="concurrent bot matches")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of play per engine")
+    parser.add_argument("--engines", nargs="+", default=["threads", "asyncio"])
+    args = parser.parse_args()
+
+    print(f"{'engine':<10} {'rss idle':>12} {'rss held':>12} {'threads':>8} {'moves/s':>10} {'games':>6}")
+    for engine in args.engines:
+        r = bench_engine(engine, args.idle, args.matches, args.duration)
+        print(
+            f"{r['engine']:<10} {r['rss_base']:>12} {r['rss_held']:>12} "
+            f"{r['threads_held']:>8} {r['moves_per_sec']:>10.0f} {r['games']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
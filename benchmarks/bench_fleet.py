@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of move resolution: the original list-based ship scan
+against the bitboard Fleet.
+
+Each iteration resolves one full game: every cell of the board is fired
+at once, including the sink and game-over checks the server performs
+after every shot.
+
+Usage:
+    python benchmarks/bench_fleet.py --games 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fleet import GRID_SIZE, Fleet, cell_index  # noqa: E402
+
+SHIP_POSITIONS = [
+    [(0, 0), (0, 1)],
+    [(2, 3), (3, 3), (4, 3)],
+    [(6, 2), (6, 3), (6, 4), (6, 5)],
+    [(1, 9), (2, 9), (3, 9), (4, 9), (5, 9)],
+]
+
+
+def legacy_fleet():
+    return [{"positions": list(p), "hits": [], "sunk": False} for p in SHIP_POSITIONS]
+
+
+def legacy_move(ships, target_row, target_col):
+    """
+    Move resolution as server.py did it before the bitboard engine.
+    """
+    hit = False
+    sunk = False
+    for ship in ships:
+        if (target_row, target_col) in ship["positions"]:
+            if (target_row, target_col) not in ship["hits"]:
+                ship["hits"].append((target_row, target_col))
+            hit = True
+            if set(ship["hits"]) == set(ship["positions"]):
+                ship["sunk"] = True
+                sunk = True
+            break
+    all_sunk = all(ship["sunk"] for ship in ships)
+    return hit, sunk, all_sunk
+
+
+def bench_legacy(shots, games: int) -> float:
+    started = time.perf_counter()
+    for _ in range(games):
+        ships = legacy_fleet()
+        for row, col in shots:
+            legacy_move(ships, row, col)
+    return time.perf_counter() - started
+
+
+def bench_bitboard(shots, games: int) -> float:
+    cells = [cell_index(row, col) for row, col in shots]
+    started = time.perf_counter()
+    for _ in range(games):
+        fleet = Fleet.from_positions(SHIP_POSITIONS)
+        for cell in cells:
+            if not fleet.already_shot(cell):
+                fleet.fire(cell)
+                fleet.all_sunk()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=2000)
+    args = parser.parse_args()
+
+    shots = [(row, col) for row in range(GRID_SIZE) for col in range(GRID_SIZE)]
+    random.Random(0).shuffle(shots)
+    moves = args.games * len(shots)
+
+    legacy = bench_legacy(shots, args.games)
+    bitboard = bench_bitboard(shots, args.games)
+
+    print(f"{'engine':<10} {'ns/move':>10} {'moves/s':>12}")
+    for name, elapsed in (("legacy", legacy), ("bitboard", bitboard)):
+        print(f"{name:<10} {elapsed / moves * 1e9:>10.0f} {moves / elapsed:>12.0f}")
+    print(f"speedup: {legacy / bitboard:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
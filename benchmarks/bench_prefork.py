@@ -0,0 +1,103 @@
+"""
+How moves/sec scales with the number of prefork workers.
+
+For each worker count a prefork.py server is started on a free port and
+loaded by --clients loadtest.py processes at once (one load generator
+process cannot saturate several workers). Their moves/sec are added up.
+
+Usage:
+    python benchmarks/bench_prefork.py --workers 1 2 4 8 --matches 100 --duration 15
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def spawn_prefork(port: int, workers: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "prefork.py", "--port", str(port), "--workers", str(workers), "--widen-after", "0"],
+        cwd=SRC_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def run_clients(port: int, args) -> float:
+    """
+    Run the load generators in parallel; returns their total moves/sec.
+    """
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                os.path.join(BENCH_DIR, "loadtest.py"),
+                "--port", str(port),
+                "--matches", str(max(1, args.matches // args.clients)),
+                "--ramp-up", str(args.ramp_up),
+                "--duration", str(args.duration),
+                "--protocol", args.protocol,
+                "--seed", str(i * 100000),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for i in range(args.clients)
+    ]
+    total = 0.0
+    for proc in procs:
+        out, _ = proc.communicate()
+        for line in out.splitlines():
+            if line.startswith("moves/sec:"):
+                total += float(line.split()[1])
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="load generator processes")
+    parser.add_argument("--matches", type=int, default=100, help="concurrent matches over all clients")
+    parser.add_argument("--ramp-up", type=float, default=3.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--protocol", choices=("json", "binary"), default="json")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} load generator processes, {args.matches} matches")
+    print(f"{'workers':>8} {'moves/sec':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        proc = spawn_prefork(port, workers)
+        try:
+            rate = run_clients(port, args)
+        finally:
+            proc.terminate()
+            proc.wait()
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline if baseline else 0:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
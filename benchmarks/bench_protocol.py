@@ -0,0 +1,84 @@
+"""
+Encode/decode cost and frame size of every message type, JSON versus
+the binary protocol negotiated in "join".
+
+Usage:
+    python benchmarks/bench_protocol.py --number 50000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from protocol import HEADER, PROTOCOL_BINARY, PROTOCOL_JSON, decode_body, encode  # noqa: E402
+
+MESSAGES = [
+    {"type": "place", "ships": [
+        {"start": "A1", "end": "B1"},
+        {"start": "C3", "end": "C5"},
+        {"start": "E2", "end": "H2"},
+        {"start": "J1", "end": "J5"},
+    ]},
+    {"type": "ready"},
+    {"type": "move", "coord": "B7"},
+    {"type": "start_gameplay"},
+    {"type": "turn", "message": "Your turn!"},
+    {"type": "result", "status": "miss", "coord": "B7"},
+    {"type": "result", "status": "sink", "coord": "H2", "sunk_coords": ["E2", "F2", "G2", "H2"]},
+    {"type": "opponent_move", "coord": "B7", "status": "hit"},
+    {"type": "gameover", "winner": "Player1"},
+    {"type": "error", "message": "It is not your turn."},
+    {"type": "welcome", "protocol": PROTOCOL_BINARY, "match": 42, "seat": 1},
+]
+
+
+def per_call_ns(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    args = parser.parse_args()
+
+    print(
+        f"{'message':<16} {'json B':>7} {'bin B':>6} "
+        f"{'json enc':>9} {'bin enc':>8} {'json dec':>9} {'bin dec':>8}  (ns/call)"
+    )
+    totals = [0.0, 0.0, 0.0, 0.0, 0, 0]
+    for message in MESSAGES:
+        label = message["type"] if message["type"] != "result" else f"result/{message['status']}"
+        row = []
+        for version in (PROTOCOL_JSON, PROTOCOL_BINARY):
+            frame = encode(message, version)
+            body = frame[HEADER.size:]
+            assert decode_body(body) == message, label
+            row.append((
+                len(frame),
+                per_call_ns(lambda: encode(message, version), args.number),
+                per_call_ns(lambda: decode_body(body), args.number),
+            ))
+        (json_len, json_enc, json_dec), (bin_len, bin_enc, bin_dec) = row
+        print(
+            f"{label:<16} {json_len:>7} {bin_len:>6} "
+            f"{json_enc:>9.0f} {bin_enc:>8.0f} {json_dec:>9.0f} {bin_dec:>8.0f}"
+        )
+        for i, value in enumerate((json_enc, bin_enc, json_dec, bin_dec, json_len, bin_len)):
+            totals[i] += value
+
+    json_enc, bin_enc, json_dec, bin_dec, json_len, bin_len = totals
+    print(
+        f"{'total':<16} {json_len:>7} {bin_len:>6} "
+        f"{json_enc:>9.0f} {bin_enc:>8.0f} {json_dec:>9.0f} {bin_dec:>8.0f}"
+    )
+    print(
+        f"bytes: {json_len / bin_len:.1f}x smaller, "
+        f"encode: {json_enc / bin_enc:.1f}x faster, decode: {json_dec / bin_dec:.1f}x faster"
+    )
+
+
+if __name__ == "__main__":
+    main()
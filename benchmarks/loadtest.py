@@ -0,0 +1,401 @@
+"""
+Headless load generator for the Battleship server.
+
+Opens 2 x --matches bot connections on localhost, ramped up over
+--ramp-up seconds. Every bot plays complete join/place/ready/move games
+with a random fleet and random shots, and starts a new game when one ends,
+until --duration has elapsed. Reported:
+
+  * moves/sec and games finished
+  * p50/p95/p99 move round-trip latency (move sent -> result received)
+  * connection failures, dropped connections and stalled games
+  * server RSS at start, peak and end (needs --server-pid or --spawn)
+
+With --spectators N every match gets on average N spectator connections
+watching it, and spectator events/sec are reported; --slow-spectators
+opens watchers that never read, to check they do not slow the players.
+
+Usage:
+    python benchmarks/loadtest.py --spawn threads --matches 200 --duration 30
+    python benchmarks/loadtest.py --port 5001 --server-pid 12345 --matches 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from client_core import ClientSession  # noqa: E402
+from fleet import CELLS, COORDS, GRID_SIZE, cell_index  # noqa: E402
+from protocol import PROTOCOL_BINARY, PROTOCOL_JSON, ProtocolError  # noqa: E402
+
+SHIP_SIZES = (2, 3, 4, 5)
+
+# A game with no server message for this long is abandoned
+STALL_TIMEOUT = 10.0
+
+
+def random_fleet(rng: random.Random) -> list:
+    """
+    Return a legal fleet as the "ships" payload of a "place" message.
+    """
+    occupied = set()
+    ships = []
+    for size in SHIP_SIZES:
+        while True:
+            horizontal = rng.random() < 0.5
+            row = rng.randrange(GRID_SIZE if horizontal else GRID_SIZE - size + 1)
+            col = rng.randrange(GRID_SIZE - size + 1 if horizontal else GRID_SIZE)
+            cells = [
+                cell_index(row, col + i) if horizontal else cell_index(row + i, col)
+                for i in range(size)
+            ]
+            if occupied.isdisjoint(cells):
+                occupied.update(cells)
+                ships.append({"start": COORDS[cells[0]], "end": COORDS[cells[-1]]})
+                break
+    return ships
+
+
+class Stats:
+    def __init__(self):
+        self.moves = 0
+        self.games = 0
+        self.latencies = []
+        self.connect_failures = 0
+        self.dropped = 0
+        self.stalled = 0
+        self.errors = 0
+        self.connections = 0
+
+        # Matches in progress, for spectators to pick from
+        self.live = set()
+        self.spectator_events = 0
+        self.spectators_dropped = 0
+
+
+class Bot:
+    """
+    One headless player. Keeps playing games until the deadline.
+    """
+
+    def __init__(self, host: str, port: int, name: str, protocol: int, stats: Stats, seed: int):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.protocol = protocol
+        self.stats = stats
+        self.rng = random.Random(seed)
+
+    async def run(self, stop_at: float) -> None:
+        while time.monotonic() < stop_at:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), timeout=5
+                )
+            except (OSError, asyncio.TimeoutError):
+                self.stats.connect_failures += 1
+                await asyncio.sleep(0.5)
+                continue
+
+            self.stats.connections += 1
+            try:
+                await self.play_game(reader, writer, stop_at)
+            except (OSError, ProtocolError, asyncio.IncompleteReadError):
+                self.stats.dropped += 1
+            finally:
+                self.stats.connections -= 1
+                writer.close()
+
+    async def play_game(self, reader, writer, stop_at: float) -> None:
+        session = ClientSession(self.name, self.protocol)
+        writer.write(session.join_message())
+
+        shots = list(range(CELLS))
+        self.rng.shuffle(shots)
+        sent_at = None
+
+        while True:
+            timeout = min(STALL_TIMEOUT, stop_at - time.monotonic())
+            if timeout <= 0:
+                return
+            try:
+                data = await asyncio.wait_for(reader.read(4096), timeout)
+            except asyncio.TimeoutError:
+                if time.monotonic() < stop_at:
+                    self.stats.stalled += 1
+                return
+            if not data:
+                self.stats.dropped += 1
+                return
+
+            for message in session.receive(data):
+                msg_type = message.get("type")
+
+                if msg_type == "ping":
+                    writer.write(session.pong_message())
+
+                elif msg_type == "start_gameplay":
+                    self.stats.live.add(message.get("match"))
+
+                elif msg_type == "welcome":
+                    writer.write(
+                        session.place_message(random_fleet(self.rng)) + session.ready_message()
+                    )
+
+                elif msg_type == "turn":
+                    sent_at = time.perf_counter()
+                    writer.write(session.move_message(COORDS[shots.pop()]))
+
+                elif msg_type == "result":
+                    if sent_at is not None:
+                        self.stats.latencies.append(time.perf_counter() - sent_at)
+                        sent_at = None
+                    self.stats.moves += 1
+
+                elif msg_type == "gameover":
+                    self.stats.games += 1
+                    self.stats.live.discard(session.state.match_id)
+                    return
+
+                elif msg_type == "error":
+                    self.stats.errors += 1
+
+
+class Spectator:
+    """
+    Watches random live matches until the deadline. A slow spectator
+    never reads from its socket.
+    """
+
+    def __init__(self, host: str, port: int, protocol: int, stats: Stats, seed: int, slow: bool = False):
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.stats = stats
+        self.rng = random.Random(seed)
+        self.slow = slow
+
+    async def run(self, stop_at: float) -> None:
+        while time.monotonic() < stop_at:
+            if not self.stats.live:
+                await asyncio.sleep(0.1)
+                continue
+            match_id = self.rng.choice(sorted(self.stats.live))
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                self.stats.connect_failures += 1
+                await asyncio.sleep(0.5)
+                continue
+            try:
+                session = ClientSession("spectator", self.protocol)
+                writer.write(session.spectate_message(match_id))
+                if self.slow:
+                    await asyncio.sleep(stop_at - time.monotonic())
+                else:
+                    await self.watch(reader, writer, session, stop_at)
+            except (OSError, ProtocolError):
+                self.stats.spectators_dropped += 1
+            finally:
+                writer.close()
+
+    async def watch(self, reader, writer, session, stop_at: float) -> None:
+        while True:
+            timeout = stop_at - time.monotonic()
+            if timeout <= 0:
+                return
+            try:
+                data = await asyncio.wait_for(reader.read(4096), timeout)
+            except asyncio.TimeoutError:
+                return
+            if not data:
+                self.stats.spectators_dropped += 1
+                return
+            for message in session.receive(data):
+                if message.get("type") == "ping":
+                    writer.write(session.pong_message())
+                    continue
+                self.stats.spectator_events += 1
+                if message.get("type") in ("gameover", "error"):
+                    return
+
+
+# -------------------------------------------------
+# Server process helpers
+# -------------------------------------------------
+def read_rss_kb(pid) -> int:
+    if pid is None:
+        return 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(port: int, extra_args) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "server.py", "--port", str(port), *extra_args],
+        cwd=SRC_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+# -------------------------------------------------
+# Load test
+# -------------------------------------------------
+async def run_load(args, server_pid) -> dict:
+    stats = Stats()
+    started = time.monotonic()
+    stop_at = started + args.ramp_up + args.duration
+    protocol = PROTOCOL_BINARY if args.protocol == "binary" else PROTOCOL_JSON
+
+    rss_start = read_rss_kb(server_pid)
+    rss_peak = rss_start
+
+    bots = 2 * args.matches
+    delay = args.ramp_up / bots if bots else 0
+    tasks = []
+    for i in range(bots):
+        bot = Bot(args.host, args.port, f"Bot{i}", protocol, stats, seed=args.seed + i)
+        tasks.append(asyncio.create_task(bot.run(stop_at)))
+        if delay:
+            await asyncio.sleep(delay)
+
+    for i in range(args.spectators * args.matches + args.slow_spectators):
+        slow = i >= args.spectators * args.matches
+        spectator = Spectator(args.host, args.port, protocol, stats, seed=args.seed + i, slow=slow)
+        tasks.append(asyncio.create_task(spectator.run(stop_at)))
+
+    # Measure only the steady state after ramp-up
+    await asyncio.sleep(max(0.0, started + args.ramp_up - time.monotonic()))
+    moves_before = stats.moves
+    events_before = stats.spectator_events
+    measure_start = time.monotonic()
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(0.5)
+        rss_peak = max(rss_peak, read_rss_kb(server_pid))
+    elapsed = time.monotonic() - measure_start
+    rss_end = read_rss_kb(server_pid)
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = sorted(stats.latencies)
+    return {
+        "bots": bots,
+        "moves_per_sec": (stats.moves - moves_before) / elapsed if elapsed > 0 else 0.0,
+        "moves": stats.moves,
+        "spectator_events_per_sec": (stats.spectator_events - events_before) / elapsed if elapsed > 0 else 0.0,
+        "spectators_dropped": stats.spectators_dropped,
+        "games": stats.games,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "connect_failures": stats.connect_failures,
+        "dropped": stats.dropped,
+        "stalled": stats.stalled,
+        "errors": stats.errors,
+        "rss_start": rss_start,
+        "rss_peak": rss_peak,
+        "rss_end": rss_end,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"bots:               {result['bots']}")
+    print(f"moves/sec:          {result['moves_per_sec']:.0f}")
+    print(f"moves / games:      {result['moves']} / {result['games']}")
+    print(
+        "move RTT p50/95/99: "
+        f"{result['p50'] * 1000:.2f} / {result['p95'] * 1000:.2f} / {result['p99'] * 1000:.2f} ms"
+    )
+    print(f"connect failures:   {result['connect_failures']}")
+    print(f"dropped / stalled:  {result['dropped']} / {result['stalled']}")
+    print(f"error replies:      {result['errors']}")
+    if result["spectator_events_per_sec"] or result["spectators_dropped"]:
+        print(f"spectator events/s: {result['spectator_events_per_sec']:.0f}")
+        print(f"spectators dropped: {result['spectators_dropped']}")
+    if result["rss_start"]:
+        print(
+            "server RSS:         "
+            f"{result['rss_start']} kB start, {result['rss_peak']} kB peak, {result['rss_end']} kB end"
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--matches", type=int, default=50, help="concurrent matches (2 bots each)")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds to open all bots")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured after ramp-up")
+    parser.add_argument("--protocol", choices=("json", "binary"), default="json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spectators", type=int, default=0, help="spectators per match")
+    parser.add_argument("--slow-spectators", type=int, default=0, help="spectators that never read")
+    parser.add_argument("--server-pid", type=int, help="pid of a running server, for RSS sampling")
+    parser.add_argument(
+        "--spawn",
+        metavar="ENGINE",
+        choices=("threads", "asyncio"),
+        help="start server.py with this engine on a free port instead of using --port",
+    )
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+
+    proc = None
+    server_pid = args.server_pid
+    if args.spawn:
+        args.port = free_port()
+        proc = spawn_server(args.port, ["--engine", args.spawn, "--widen-after", "0"])
+        server_pid = proc.pid
+
+    try:
+        result = asyncio.run(run_load(args, server_pid))
+    finally:
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()
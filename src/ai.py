@@ -0,0 +1,144 @@
+"""
+Shot selection for computer players.
+
+A strategy only sees what a human opponent would: the cells it fired at,
+which of them hit, and the ships it has sunk (revealed by "sink"
+results). All of that is read from the bitboards of the target Fleet.
+
+Difficulty levels:
+    easy    random unexplored cell
+    medium  hunt/target: checkerboard hunting, then finish off hits
+            by firing at their neighbours
+    hard    probability density: for every cell, count the legal
+            placements of the remaining ships that cover it, heavily
+            favouring placements through unresolved hits
+"""
+
+import random
+
+from fleet import BOARD_MASK, FLEET_SIZES, GRID_SIZE, PLACEMENT_CELLS, PLACEMENTS, mask_cells
+
+DIFFICULTIES = ("easy", "medium", "hard")
+DEFAULT_DIFFICULTY = "hard"
+
+# Weight of a placement per unresolved hit it passes through
+TARGET_WEIGHT = 50
+
+# Cells with (row + col) even; every ship of size >= 2 covers one of them
+CHECKERBOARD = sum(1 << cell for cell in range(GRID_SIZE * GRID_SIZE) if (cell // GRID_SIZE + cell % GRID_SIZE) % 2 == 0)
+
+_LEFT_EDGE = sum(1 << (row * GRID_SIZE) for row in range(GRID_SIZE))
+_RIGHT_EDGE = _LEFT_EDGE << (GRID_SIZE - 1)
+
+
+def neighbours(mask: int) -> int:
+    """
+    Cells orthogonally adjacent to any cell of `mask`.
+    """
+    up = mask >> GRID_SIZE
+    down = (mask << GRID_SIZE) & BOARD_MASK
+    left = (mask & ~_LEFT_EDGE) >> 1
+    right = (mask & ~_RIGHT_EDGE) << 1
+    return (up | down | left | right) & ~mask
+
+
+class BoardView:
+    """
+    Public knowledge about the opponent's board.
+    """
+
+    __slots__ = ("shots", "hits", "sunk", "remaining")
+
+    def __init__(self, shots: int, hits: int, sunk_ships, fleet_sizes=FLEET_SIZES):
+        self.shots = shots
+        self.hits = hits
+        self.sunk = 0
+        remaining = list(fleet_sizes)
+        for mask in sunk_ships:
+            self.sunk |= mask
+            size = bin(mask).count("1")
+            if size in remaining:
+                remaining.remove(size)
+        self.remaining = remaining
+
+    @classmethod
+    def of(cls, fleet) -> "BoardView":
+        return cls(fleet.shots, fleet.hits, fleet.sunk_ships())
+
+    @property
+    def open_hits(self) -> int:
+        """
+        Hits that do not belong to a sunk ship yet.
+        """
+        return self.hits & ~self.sunk
+
+    @property
+    def unexplored(self) -> int:
+        return BOARD_MASK & ~self.shots
+
+
+def _pick(mask: int, rng) -> int:
+    return rng.choice(mask_cells(mask))
+
+
+def shot_easy(view: BoardView, rng) -> int:
+    return _pick(view.unexplored, rng)
+
+
+def shot_medium(view: BoardView, rng) -> int:
+    candidates = neighbours(view.open_hits) & view.unexplored
+    if not candidates:
+        candidates = CHECKERBOARD & view.unexplored or view.unexplored
+    return _pick(candidates, rng)
+
+
+def density(view: BoardView) -> list:
+    """
+    Return per-cell weights: how many legal placements of the remaining
+    ships cover each unexplored cell.
+    """
+    counts = [0] * (GRID_SIZE * GRID_SIZE)
+
+    # Placements may not cross a miss or a sunk ship
+    blocked = (view.shots & ~view.hits) | view.sunk
+    open_hits = view.open_hits
+
+    for size in set(view.remaining):
+        copies = view.remaining.count(size)
+        for mask in PLACEMENTS[size]:
+            if mask & blocked:
+                continue
+            through = mask & open_hits
+            weight = copies
+            if through:
+                weight *= TARGET_WEIGHT * bin(through).count("1")
+            for cell in PLACEMENT_CELLS[mask]:
+                counts[cell] += weight
+
+    # Never fire at a known cell
+    for cell in mask_cells(view.shots):
+        counts[cell] = 0
+    return counts
+
+
+def shot_hard(view: BoardView, rng) -> int:
+    counts = density(view)
+    best = max(counts)
+    if best == 0:
+        return shot_easy(view, rng)
+    return rng.choice([cell for cell, count in enumerate(counts) if count == best])
+
+
+STRATEGIES = {
+    "easy": shot_easy,
+    "medium": shot_medium,
+    "hard": shot_hard,
+}
+
+
+def choose_shot(fleet, difficulty: str = DEFAULT_DIFFICULTY, rng=random) -> int:
+    """
+    Pick the next cell to fire at `fleet` for the given difficulty.
+    """
+    strategy = STRATEGIES.get(difficulty, STRATEGIES[DEFAULT_DIFFICULTY])
+    return strategy(BoardView.of(fleet), rng)
@@ -0,0 +1,159 @@
+import asyncio
+import time
+
+import handlers
+import log
+import profiling
+from handlers import Connection, handle_connect, handle_disconnect, handle_message, run_matchmaking
+from matchmaking import SWEEP_INTERVAL
+from protocol import FrameDecoder
+
+logger = log.get_logger("server")
+
+# Bytes a connection may have waiting in its transport before
+# try_send_frame refuses more (slow spectators are dropped)
+WRITE_BUFFER_LIMIT = 64 * 1024
+
+# Buffered bytes at which a peer counts as stalled and is disconnected
+HIGH_WATER = 256 * 1024
+
+
+class StreamConnection(Connection):
+    """
+    Connection served by a coroutine on the shared event loop.
+    Writes are buffered by the transport and never block the loop.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, reader: asyncio.StreamReader = None):
+        super().__init__(writer.get_extra_info("peername"))
+        self.writer = writer
+        self.reader = reader
+
+        # Set to a callable(decoder) when the socket is being handed to
+        # another worker process (prefork.py); it runs instead of the
+        # disconnect cleanup once reading has stopped
+        self.detach = None
+        # Decoded messages left for that worker to handle
+        self.unhandled = []
+
+    def write(self, data: bytes) -> None:
+        transport = self.writer.transport
+        if transport.get_write_buffer_size() > HIGH_WATER:
+            logger.warning("client_stalled", addr=self.addr, waiting=transport.get_write_buffer_size())
+            transport.abort()
+            raise ConnectionError("Peer is not reading.")
+        self.writer.write(data)
+        handlers.metrics.bytes_out += len(data)
+
+    def try_send_frame(self, data: bytes) -> bool:
+        if self.writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+            return False
+        self.writer.write(data)
+        handlers.metrics.bytes_out += len(data)
+        return True
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def dispatch(conn: StreamConnection, messages: list) -> None:
+    """
+    Handle decoded messages in order. Once one of them hands the
+    connection to another worker, the rest are kept for that worker.
+    """
+    for i, message in enumerate(messages):
+        if conn.detach is not None:
+            conn.unhandled = messages[i:]
+            return
+        handle_message(conn, message)
+
+
+async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, conn=None, decoder=None) -> None:
+    """
+    Serve one connection. `conn` and `decoder` are given for a connection
+    adopted from another worker, with its player state already set.
+    """
+    if conn is None:
+        conn = StreamConnection(writer, reader)
+        logger.info("client_connected", addr=conn.addr)
+    if decoder is None:
+        decoder = FrameDecoder()
+    metrics = handlers.metrics
+    metrics.connections += 1
+    handle_connect(conn)
+
+    while True:
+        try:
+            data = await reader.read(4096)
+
+            # Connection closed
+            if not data:
+                if conn.detach is not None:
+                    metrics.connections -= 1
+                    handlers.open_connections.discard(conn)
+                    conn.detach(decoder)
+                    return
+                logger.info("client_disconnected", addr=conn.addr)
+                break
+            metrics.bytes_in += len(data)
+            conn.last_seen = time.monotonic()
+            profiling.checkpoint()
+
+            dispatch(conn, decoder.feed(data))
+
+            # Let the transport push back if the peer stops reading
+            await writer.drain()
+
+        except Exception as e:
+            logger.warning("client_error", addr=conn.addr, error=e)
+            break
+
+    # Cleanup after disconnect
+    metrics.connections -= 1
+    handle_disconnect(conn)
+    conn.close()
+
+
+async def matchmaking_loop() -> None:
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        run_matchmaking()
+
+
+async def reaper_loop() -> None:
+    while True:
+        await asyncio.sleep(handlers.REAP_INTERVAL)
+        try:
+            handlers.reap()
+        except Exception:
+            logger.exception("reaper_failed")
+
+
+async def serve(host: str, port: int, reuse_port: bool = False) -> None:
+    # AI turns and spectator deliveries run as callbacks on this loop
+    # instead of worker threads
+    handlers.defer = asyncio.get_running_loop().call_soon_threadsafe
+    handlers.spectator_feed.schedule = handlers.defer
+
+    server = await asyncio.start_server(handle_client, host, port, reuse_port=reuse_port)
+    logger.info("listening", host=host, port=port, engine="asyncio")
+
+    sweeper = asyncio.create_task(matchmaking_loop())
+    reaper = asyncio.create_task(reaper_loop())
+
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            reaper.cancel()
+
+
+def run(host: str, port: int) -> None:
+    """
+    Asyncio engine: all connections share one event loop and one thread.
+    """
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
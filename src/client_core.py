@@ -0,0 +1,361 @@
+"""
+Headless client core: connection handling, server message handlers and
+board state, with no pygame dependency and no side effects at import.
+
+    GameState      what the player knows about the current game
+    SpectatorState both players' shots in a match being watched
+    ClientSession  protocol negotiation and framing; turns received bytes
+                   into state updates and outgoing messages into bytes,
+                   without doing any I/O itself
+    GameClient     a blocking socket plus a background listener thread
+                   driving a ClientSession
+
+The pygame clients sit on GameClient; bots and tests that want their own
+I/O (e.g. asyncio) can drive a ClientSession directly.
+"""
+
+import select
+import socket
+import threading
+import time
+
+import log
+import profiling
+from protocol import PROTOCOL_BINARY, PROTOCOL_JSON, FrameDecoder, encode
+
+logger = log.get_logger("client")
+
+HOST = "localhost"
+PORT = 5001
+
+# Attempts, one second apart, to get back into a running game after the
+# server went away (e.g. a restart that resumes matches from a snapshot)
+RECONNECT_ATTEMPTS = 30
+
+
+class GameState:
+    """
+    Board state of one game as seen by a player.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.match_id = None
+        self.seat = None
+        self.token = None          # Resume token from "welcome"
+        self.started = False
+        self.your_turn = False
+        self.ships = []            # List of {"start", "end"} (filled by "state")
+        self.your_moves = {}       # Dict: {"B3": "hit" / "miss" / "sink"}
+        self.enemy_moves = []      # List of (coord, status) tuples from opponent
+        self.winner = None
+        self.last_error = None
+
+    @property
+    def game_over(self) -> bool:
+        return self.winner is not None
+
+    def apply(self, message: dict) -> None:
+        """
+        Update the state from one server message.
+        """
+        handler = getattr(self, f"_on_{message.get('type')}", None)
+        if handler is not None:
+            handler(message)
+
+    def _on_welcome(self, message: dict) -> None:
+        self.match_id = message.get("match") or None
+        self.seat = message.get("seat")
+        self.token = message.get("token", self.token)
+
+    def _on_state(self, message: dict) -> None:
+        # Sent when resuming a running game: replaces the whole board
+        self.started = True
+        self.match_id = message["match"]
+        self.seat = message["seat"]
+        self.your_turn = message["your_turn"]
+        self.ships = message["ships"]
+        self.your_moves = dict(message["your_moves"])
+        self.enemy_moves = [tuple(move) for move in message["enemy_moves"]]
+
+    def _on_start_gameplay(self, message: dict) -> None:
+        self.started = True
+        if "match" in message:
+            self.match_id = message["match"]
+            self.seat = message["seat"]
+
+    def _on_turn(self, message: dict) -> None:
+        self.your_turn = True
+
+    def _on_result(self, message: dict) -> None:
+        status = message["status"]
+        coord = message["coord"]
+
+        if status == "sink":
+            for c in message.get("sunk_coords", [coord]):
+                self.your_moves[c] = "sink"
+        else:
+            self.your_moves[coord] = status
+
+        self.your_turn = False
+
+    def _on_opponent_move(self, message: dict) -> None:
+        self.enemy_moves.append((message["coord"], message["status"]))
+
+    def _on_gameover(self, message: dict) -> None:
+        self.winner = message.get("winner")
+        self.your_turn = False
+
+    def _on_error(self, message: dict) -> None:
+        self.last_error = message.get("message")
+
+
+class SpectatorState:
+    """
+    Shots of both seats in a match watched as a spectator.
+    """
+
+    def __init__(self):
+        self.match_id = None
+        self.names = [None, None]
+        self.turn = None
+        self.shots = [{}, {}]          # seat -> {coord: status} of the shots it fired
+        self.winner = None
+        self.last_error = None
+
+    @property
+    def game_over(self) -> bool:
+        return self.winner is not None
+
+    def apply(self, message: dict) -> None:
+        """
+        Update the state from one server message.
+        """
+        handler = getattr(self, f"_on_{message.get('type')}", None)
+        if handler is not None:
+            handler(message)
+
+    def _on_spectate_state(self, message: dict) -> None:
+        self.match_id = message["match"]
+        self.names = message["names"]
+        self.turn = message["turn"]
+        self.shots = [
+            {coord: status for status, coords in fired.items() for coord in coords}
+            for fired in message["shots"]
+        ]
+
+    def _on_spectate_move(self, message: dict) -> None:
+        seat = message["seat"]
+        if message["status"] == "sink":
+            for c in message.get("sunk_coords", [message["coord"]]):
+                self.shots[seat][c] = "sink"
+        else:
+            self.shots[seat][message["coord"]] = message["status"]
+        self.turn = 1 - seat
+
+    def _on_gameover(self, message: dict) -> None:
+        self.winner = message.get("winner")
+        self.turn = None
+
+    def _on_error(self, message: dict) -> None:
+        self.last_error = message.get("message")
+
+
+class ClientSession:
+    """
+    Sans-I/O protocol state of one client connection.
+    """
+
+    def __init__(self, name: str, protocol: int = PROTOCOL_BINARY, state=None):
+        self.name = name
+        self.requested_protocol = protocol
+
+        # Protocol confirmed by the server's "welcome"; JSON until then
+        self.protocol = PROTOCOL_JSON
+
+        self.state = state if state is not None else GameState()
+        self.decoder = FrameDecoder()
+
+    def encode(self, payload: dict) -> bytes:
+        return encode(payload, self.protocol)
+
+    def join_message(self, match_id: int = None, token: int = None) -> bytes:
+        payload = {"type": "join", "name": self.name, "protocol": self.requested_protocol}
+        if match_id is not None:
+            payload["match"] = match_id
+        if token is not None:
+            payload["token"] = token
+        return encode(payload)
+
+    def spectate_message(self, match_id: int) -> bytes:
+        return encode({"type": "spectate", "match": match_id, "protocol": self.requested_protocol})
+
+    def restart(self) -> None:
+        """
+        Forget the framing and protocol of a closed connection before
+        joining again on a new one; the game state is kept.
+        """
+        self.protocol = PROTOCOL_JSON
+        self.decoder = FrameDecoder()
+
+    def place_message(self, ships: list) -> bytes:
+        return self.encode({"type": "place", "ships": ships})
+
+    def ready_message(self, **extra) -> bytes:
+        return self.encode({"type": "ready", **extra})
+
+    def pong_message(self) -> bytes:
+        return self.encode({"type": "pong"})
+
+    def move_message(self, coord: str) -> bytes:
+        self.state.your_turn = False
+        return self.encode({"type": "move", "coord": coord})
+
+    def receive(self, data: bytes) -> list:
+        """
+        Feed bytes read from the socket; returns the completed messages
+        after applying them to the state.
+        """
+        messages = self.decoder.feed(data)
+        for message in messages:
+            if message.get("type") == "welcome":
+                self.protocol = message.get("protocol", PROTOCOL_JSON)
+            self.state.apply(message)
+        return messages
+
+
+class GameClient:
+    """
+    Connection to the server with a background listener thread.
+
+    `on_message(message)` is called from the listener thread after each
+    server message has been applied to `state`.
+    """
+
+    def __init__(self, name: str, host: str = HOST, port: int = PORT, protocol: int = PROTOCOL_BINARY, on_message=None):
+        self.host = host
+        self.port = port
+        self.session = ClientSession(name, protocol)
+        self.on_message = on_message
+        self.socket = None
+        self._listener = None
+        self._running = False
+
+    @property
+    def state(self) -> GameState:
+        return self.session.state
+
+    def connect(self) -> None:
+        """
+        Connect, send "join" and start listening for server messages.
+        """
+        self._open()
+        self.socket.sendall(self.session.join_message())
+
+        self._running = True
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+        logger.info("connected", host=self.host, port=self.port, player=self.session.name)
+
+    def _open(self) -> None:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.connect((self.host, self.port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.settimeout(0.5)  # 0.5s timeout for non-blocking behavior
+
+    def reconnect(self) -> bool:
+        """
+        Rejoin the current match on a new connection, taking the seat
+        back with the resume token. Returns False if the server could not
+        be reached.
+        """
+        match_id = self.state.match_id
+        token = self.state.token
+        # No moves until the server confirms the turn after the resume
+        self.state.your_turn = False
+        for _ in range(RECONNECT_ATTEMPTS):
+            if not self._running:
+                return False
+            time.sleep(1)
+            try:
+                self.socket.close()
+                self._open()
+                self.session.restart()
+                self.socket.sendall(self.session.join_message(match_id, token))
+            except OSError:
+                continue
+            logger.info("rejoined", match=match_id)
+            return True
+        return False
+
+    def close(self) -> None:
+        self._running = False
+        if self.socket is not None:
+            self.socket.close()
+
+    def send(self, data: bytes) -> None:
+        """
+        Send to the server. While the connection is down (the listener is
+        reconnecting) the data is dropped; a resumed game continues from
+        the server's "state".
+        """
+        try:
+            self.socket.sendall(data)
+        except OSError as exc:
+            logger.warning("send_failed", error=exc)
+
+    def place(self, ships: list) -> None:
+        self.send(self.session.place_message(ships))
+
+    def ready(self, **extra) -> None:
+        self.send(self.session.ready_message(**extra))
+
+    def move(self, coord: str) -> None:
+        self.send(self.session.move_message(coord))
+
+    def _listen(self) -> None:
+        """
+        Background thread that listens to server messages
+        and updates game state accordingly.
+        """
+        while self._running:
+            try:
+                # Wait up to 100ms to see if there is data to read
+                ready_to_read, _, _ = select.select([self.socket], [], [], 0.1)
+                if not ready_to_read:
+                    continue
+
+                data = self.socket.recv(4096)
+                if not data:
+                    logger.info("server_closed")
+                    if self.state.started and not self.state.game_over and self.reconnect():
+                        continue
+                    break
+
+                for message in self.session.receive(data):
+                    if message.get("type") == "ping":
+                        self.send(self.session.pong_message())
+                        continue
+                    logger.debug("message_received", message=message)
+                    if self.on_message is not None:
+                        try:
+                            self.on_message(message)
+                        except Exception:
+                            logger.exception("message_failed", message=message)
+                profiling.checkpoint()
+
+            except OSError as e:
+                if not self._running:
+                    break
+                logger.warning("connection_lost", error=e)
+                if self.state.started and not self.state.game_over and self.reconnect():
+                    continue
+                break
+
+            except Exception:
+                if not self._running:
+                    break
+                # Non-fatal listening error; keep the loop running
+                logger.exception("listener_error")
@@ -0,0 +1,983 @@
+"""
+The pygame game client: start menu, ship placement, waiting, gameplay
+and game-over screens.
+
+client1.py and client2.py start it as Player1 and Player2:
+
+    python client1.py
+    python client_ui.py "Some name"
+"""
+
+import sys
+import ctypes
+
+import pygame
+from pygame.locals import *
+
+import log
+import profiling
+import render_cache
+from client_core import GameClient
+from protocol import PROTOCOL_BINARY
+
+# ------------------------------
+# Basic configuration
+# ------------------------------
+PLAYER_NAME = "Player1"  # Replaced by the name passed to run()
+
+# Set to "ai" to play against the server's computer player instead of waiting for a human
+OPPONENT = None
+AI_DIFFICULTY = "hard"    # "easy", "medium" or "hard"
+
+current_screen = "start"
+
+running = True
+start_clicked = False
+start_button_rect = None
+
+pygame.init()
+
+# ------------------------------
+# Socket configuration
+# ------------------------------
+HOST = "localhost"
+PORT = 5001
+
+# Wire protocol requested in "join"; use PROTOCOL_JSON to read traffic in a packet capture
+WIRE_PROTOCOL = PROTOCOL_BINARY
+
+# "debug" also logs every server message
+LOG_LEVEL = "info"
+log.configure(LOG_LEVEL)
+logger = log.get_logger("ui")
+
+# F12 (or SIGUSR1 outside Windows) writes a profile of the next few seconds here
+PROFILE_KEY = pygame.K_F12
+PROFILE_DIR = "."
+PROFILE_SECONDS = 10
+profile_key_down = False
+
+
+def profile_frame():
+    """
+    Called once per frame: lets the profiler see the render loop and
+    starts a capture when the profile key is pressed.
+    """
+    global profile_key_down
+    profiling.checkpoint()
+    pressed = pygame.key.get_pressed()[PROFILE_KEY]
+    if pressed and not profile_key_down and profiling.start():
+        logger.info("profile_requested", seconds=PROFILE_SECONDS, directory=PROFILE_DIR)
+    profile_key_down = pressed
+
+
+# ------------------------------
+# Frame pacing
+# ------------------------------
+# Animated screens run at ACTIVE_FPS (the waiting spinner at ANIMATION_FPS).
+# Static screens sleep in pygame.event.wait until input or a server
+# message arrives, waking at least every IDLE_TIMEOUT_MS. An unfocused
+# window animates at BACKGROUND_FPS; a minimized one only wakes for events.
+ACTIVE_FPS = 60
+ANIMATION_FPS = 30
+BACKGROUND_FPS = 5
+IDLE_TIMEOUT_MS = 1000
+
+# Posted by the listener thread so a sleeping frame loop redraws at once
+SERVER_MESSAGE = pygame.USEREVENT + 1
+
+# Event that ended the last wait, handed to the next poll_events()
+pending_events = []
+
+
+def poll_events():
+    """
+    The events of this frame (use instead of pygame.event.get()).
+    """
+    events = pending_events + pygame.event.get()
+    pending_events.clear()
+    return events
+
+
+def wait_for_event(timeout):
+    event = pygame.event.wait(timeout)
+    if event.type != pygame.NOEVENT:
+        pending_events.append(event)
+
+
+def next_frame(fps=0, timeout=IDLE_TIMEOUT_MS):
+    """
+    End a frame. Screens that animate pass `fps` and are paced by the
+    clock; static ones sleep until an event or for `timeout` ms.
+    """
+    profile_frame()
+    if not pygame.display.get_active():
+        # Minimized: nothing is visible
+        wait_for_event(IDLE_TIMEOUT_MS)
+    elif not pygame.key.get_focused():
+        wait_for_event(1000 // BACKGROUND_FPS if fps else timeout)
+    elif fps:
+        clock.tick(fps)
+    else:
+        wait_for_event(timeout)
+
+
+def on_server_message(message):
+    """
+    Called from the listener thread after the game state was updated.
+    """
+    # Wake the frame loop
+    try:
+        pygame.event.post(pygame.event.Event(SERVER_MESSAGE))
+    except pygame.error:
+        pass  # display already closed
+
+    if message.get("type") == "opponent_move":
+        # Play sounds for opponent moves
+        if message["status"] == "miss":
+            miss_sound.play()
+        elif message["status"] in ("hit", "sink"):
+            hit_sound.play()
+
+
+# GameClient and its GameState, created by run()
+client = None
+game = None
+
+# ------------------------------
+# Screen configuration - Fullscreen
+# ------------------------------
+# Get screen resolution (Windows-specific)
+user32 = ctypes.windll.user32
+SCREEN_WIDTH = user32.GetSystemMetrics(0)
+SCREEN_HEIGHT = user32.GetSystemMetrics(1) - 40  # leave some space for taskbar
+
+screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.FULLSCREEN)
+pygame.display.set_caption("Battleship")
+clock = pygame.time.Clock()
+
+# ------------------------------
+# Constants & colors
+# ------------------------------
+GRID_SIZE = 10
+CELL_SIZE = min(SCREEN_HEIGHT // 15, SCREEN_WIDTH // 25)
+GRID_WIDTH = GRID_SIZE * CELL_SIZE
+
+PLAYER_GRID_POS = (
+    SCREEN_WIDTH - GRID_WIDTH - int(SCREEN_WIDTH * 0.15),
+    int(SCREEN_HEIGHT * 0.15),
+)
+SHIP_PANEL_POS = (int(SCREEN_WIDTH * 0.1), int(SCREEN_HEIGHT * 0.15))
+
+BG_COLOR = (30, 30, 30)
+GRID_COLOR = (0, 128, 255)
+SHIP_COLOR = (0, 200, 0)
+SELECTED_SHIP_COLOR = (200, 0, 0)
+MARKER_KEY = (255, 0, 255)  # transparent color of the marker layer
+
+BIG_CELL_SIZE = CELL_SIZE
+SMALL_CELL_SIZE = CELL_SIZE // 2
+
+BIG_GRID_POS = (SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.15))         # Opponent grid
+SMALL_GRID_POS = (int(SCREEN_WIDTH * 0.1), int(SCREEN_HEIGHT * 0.15))  # Own small grid
+
+# ------------------------------
+# Load ship images
+# ------------------------------
+ship_images = {
+    size: render_cache.image(f"../assets/images/ship{size}.png", alpha=True)
+    for size in (2, 3, 4, 5)
+}
+
+# ------------------------------
+# Sound configuration
+# ------------------------------
+pygame.mixer.init()
+miss_sound = pygame.mixer.Sound("../assets/sounds/miss.wav")
+hit_sound = pygame.mixer.Sound("../assets/sounds/hit.wav")
+
+# ------------------------------
+# Helper functions
+# ------------------------------
+def get_occupied_cells(ship):
+    gx, gy = PLAYER_GRID_POS
+    start_col = (ship.x - gx) // CELL_SIZE
+    start_row = (ship.y - gy) // CELL_SIZE
+    if ship.orientation == "vertical":
+        return [(start_row + i, start_col) for i in range(ship.size)]
+    else:
+        return [(start_row, start_col + i) for i in range(ship.size)]
+
+
+def is_overlapping(new_ship, all_ships):
+    new_cells = set(get_occupied_cells(new_ship))
+    for other in all_ships:
+        if other is not new_ship and new_cells & set(get_occupied_cells(other)):
+            return True
+    return False
+
+
+def is_out_of_bounds(ship):
+    gx, gy = PLAYER_GRID_POS
+    start_col = (ship.x - gx) // CELL_SIZE
+    start_row = (ship.y - gy) // CELL_SIZE
+    if ship.orientation == "horizontal":
+        return start_col + ship.size > GRID_SIZE or start_row >= GRID_SIZE or start_row < 0
+    else:
+        return start_row + ship.size > GRID_SIZE or start_col >= GRID_SIZE or start_col < 0
+
+
+def get_ship_at_pos(pos):
+    for ship in ships:
+        if ship.get_rect().collidepoint(pos):
+            return ship
+    return None
+
+
+def draw_grid(start_x, start_y, cell_size=CELL_SIZE, surface=None):
+    surface = screen if surface is None else surface
+    for row in range(GRID_SIZE):
+        for col in range(GRID_SIZE):
+            rect = pygame.Rect(
+                start_x + col * cell_size,
+                start_y + row * cell_size,
+                cell_size,
+                cell_size,
+            )
+            pygame.draw.rect(surface, GRID_COLOR, rect, 2)
+
+
+def draw_ships():
+    for ship in ships:
+        ship.draw(screen)
+
+
+def is_ship_on_grid(ship):
+    gx, gy = PLAYER_GRID_POS
+    return gx <= ship.x < gx + GRID_WIDTH and gy <= ship.y < gy + GRID_WIDTH
+
+
+def is_all_ships_placed():
+    return all(is_ship_on_grid(ship) for ship in ships)
+
+
+def index_to_coord(row, col):
+    return chr(ord("A") + col) + str(row + 1)
+
+
+def draw_start_button():
+    """Draws the START button and returns its rect."""
+    button_width, button_height = 200, 60
+    button_x = (SCREEN_WIDTH - button_width) // 2
+    button_y = SCREEN_HEIGHT - 120
+    rect = pygame.Rect(button_x, button_y, button_width, button_height)
+
+    pygame.draw.rect(screen, (0, 180, 0), rect)
+    pygame.draw.rect(screen, (255, 255, 255), rect, 3)
+
+    text = render_cache.text("START", None, 40, (255, 255, 255))
+    text_rect = text.get_rect(center=rect.center)
+    screen.blit(text, text_rect)
+    return rect
+
+
+def draw_own_ships_on_small_grid(surface=None):
+    surface = screen if surface is None else surface
+    for ship in ships:
+        cells = get_occupied_cells(ship)
+        for row, col in cells:
+            rect = pygame.Rect(
+                SMALL_GRID_POS[0] + col * SMALL_CELL_SIZE,
+                SMALL_GRID_POS[1] + row * SMALL_CELL_SIZE,
+                SMALL_CELL_SIZE,
+                SMALL_CELL_SIZE,
+            )
+            pygame.draw.rect(surface, SHIP_COLOR, rect)
+
+
+def draw_move_result(coord, status, is_enemy=False, play_sound=False, surface=None):
+    """
+    Draw the visual result of a move on either the big (opponent) grid
+    or the small (own) grid.
+    """
+    surface = screen if surface is None else surface
+    row = int(coord[1:]) - 1
+    col = ord(coord[0].upper()) - ord("A")
+
+    if is_enemy:
+        x = SMALL_GRID_POS[0] + col * SMALL_CELL_SIZE
+        y = SMALL_GRID_POS[1] + row * SMALL_CELL_SIZE
+        size = SMALL_CELL_SIZE
+    else:
+        x = BIG_GRID_POS[0] + col * BIG_CELL_SIZE
+        y = BIG_GRID_POS[1] + row * BIG_CELL_SIZE
+        size = BIG_CELL_SIZE
+
+    center = (x + size // 2, y + size // 2)
+
+    if status == "miss":
+        pygame.draw.circle(surface, (255, 255, 255), center, size // 6)
+        if play_sound:
+            miss_sound.play()
+
+    elif status == "hit":
+        if play_sound:
+            hit_sound.play()
+        inner = pygame.Rect(x, y, size, size).inflate(-size // 3, -size // 3)
+        pygame.draw.rect(surface, (220, 20, 60), inner)
+
+    elif status == "sink":
+        if play_sound:
+            hit_sound.play()
+        pygame.draw.line(surface, (255, 255, 255), (x, y), (x + size, y + size), 3)
+        pygame.draw.line(surface, (255, 255, 255), (x + size, y), (x, y + size), 3)
+
+
+def reset_ships():
+    """
+    Reset ship positions and local game state when starting over.
+    """
+    global ships, start_clicked
+
+    ships[:] = [Ship(size, x, y) for size, (x, y) in zip(ship_sizes, ship_positions)]
+    start_clicked = False
+    game.reset()
+
+
+# ------------------------------
+# Ship class
+# ------------------------------
+class Ship:
+    def __init__(self, size, x, y):
+        self.size = size
+        self.x = x
+        self.y = y
+        self.orientation = "horizontal"
+        self.selected = False
+        self.image = ship_images[size]
+        self.original_image = self.image  # Store original for rotation
+
+    def get_rect(self):
+        if self.orientation == "horizontal":
+            width = self.size * CELL_SIZE
+            height = CELL_SIZE
+        else:
+            width = CELL_SIZE
+            height = self.size * CELL_SIZE
+        return pygame.Rect(self.x, self.y, width, height)
+
+    def draw(self, surface):
+        # Draw selection border
+        if self.selected:
+            pygame.draw.rect(surface, SELECTED_SHIP_COLOR, self.get_rect(), 3)
+
+        # Rotated and scaled once per orientation
+        rect = self.get_rect()
+        image = render_cache.transformed(self.original_image, rect.size, self.orientation)
+        surface.blit(image, rect)
+
+
+# ------------------------------
+# Initial ship positions
+# ------------------------------
+ship_sizes = [2, 3, 4, 5]
+
+ship_positions = []
+base_x = int(SCREEN_WIDTH * 0.05)
+ship_spacing = int(SCREEN_HEIGHT * 0.15)
+
+for i, size in enumerate(ship_sizes):
+    y_pos = int(SCREEN_HEIGHT * 0.2) + i * ship_spacing
+    ship_positions.append((base_x, y_pos))
+
+ships = [Ship(size, x, y) for size, (x, y) in zip(ship_sizes, ship_positions)]
+
+
+# ------------------------------
+# Gameplay renderer
+# ------------------------------
+class GameplayView:
+    """
+    Retained-mode drawing of the gameplay screen from two layers built
+    when a game starts: `board` holds everything static (background,
+    titles, both grids and the own fleet), `markers` the shots on both
+    boards on a surface whose MARKER_KEY pixels are transparent, updated
+    only for cells whose marker changed. A frame copies the changed cells
+    of both layers to the screen with one Surface.blits call, redraws the
+    status line if the turn changed, and pushes just those rectangles
+    with pygame.display.update. Frames where nothing changed cost nothing.
+    """
+
+    def __init__(self):
+        self.board = None
+        self.markers = None
+        self.ship_cells = set()
+        self.your_moves = {}
+        self.enemy_moves = []
+        self.invalidate()
+
+    def enter(self):
+        """
+        Build the layers for a new game.
+        """
+        self.ship_cells = {cell for ship in ships for cell in get_occupied_cells(ship)}
+        self.board = self.draw_board()
+        # A colorkey blits about twice as fast as per-pixel alpha
+        self.markers = pygame.Surface(screen.get_size()).convert()
+        self.markers.fill(MARKER_KEY)
+        self.markers.set_colorkey(MARKER_KEY)
+        self.your_moves = {}
+        self.enemy_moves = []
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Composite the whole screen on the next frame (window exposed).
+        """
+        self.full = True
+        self.your_turn = None
+        self.status_rect = None
+
+    def render(self):
+        if self.board is None:
+            self.enter()
+
+        # Copies: the listener thread updates the game state
+        your_moves = dict(game.your_moves)
+        enemy_moves = list(game.enemy_moves)
+        your_turn = game.your_turn
+
+        # Markers that went away mean the board was replaced (a resumed game)
+        if any(coord not in your_moves for coord in self.your_moves) or (
+            enemy_moves[:len(self.enemy_moves)] != self.enemy_moves
+        ):
+            self.markers.fill(MARKER_KEY)
+            self.your_moves = {}
+            self.enemy_moves = []
+            self.full = True
+
+        changed = []
+        for coord, status in your_moves.items():
+            if self.your_moves.get(coord) != status:
+                changed.append(self.draw_marker(coord, status, is_enemy=False))
+        for coord, status in enemy_moves[len(self.enemy_moves):]:
+            changed.append(self.draw_marker(coord, status, is_enemy=True))
+        self.your_moves = your_moves
+        self.enemy_moves = enemy_moves
+
+        if self.full:
+            screen.blits(((self.board, (0, 0)), (self.markers, (0, 0))), doreturn=False)
+            self.status_rect = None
+            self.draw_status(your_turn)
+            pygame.display.flip()
+        else:
+            dirty = changed
+            if changed:
+                screen.blits(
+                    [(self.board, rect, rect) for rect in changed] + [(self.markers, rect, rect) for rect in changed],
+                    doreturn=False,
+                )
+            if your_turn != self.your_turn:
+                dirty.append(self.draw_status(your_turn))
+            if dirty:
+                pygame.display.update(dirty)
+
+        self.full = False
+        self.your_turn = your_turn
+
+    def draw_board(self):
+        """
+        Render the static layer once.
+        """
+        board = pygame.Surface(screen.get_size()).convert()
+
+        # Background
+        board.fill((0, 0, 20))
+
+        # Title
+        title_text = render_cache.text(
+            "🛳️ BATTLESHIP - GAME BOARD 🛳️", "comicsansms", 36, (255, 255, 255), bold=True
+        )
+        board.blit(
+            title_text,
+            title_text.get_rect(center=(SCREEN_WIDTH // 2, 40)),
+        )
+
+        # Opponent board (big, right)
+        opponent_text = render_cache.text("Opponent Board", "arial", 24, (200, 200, 200))
+        board.blit(
+            opponent_text,
+            (BIG_GRID_POS[0] + GRID_WIDTH // 2 - 90, BIG_GRID_POS[1] - 40),
+        )
+        draw_grid(*BIG_GRID_POS, BIG_CELL_SIZE, surface=board)
+
+        # Own board (small, left)
+        your_text = render_cache.text("Your Board", "arial", 24, (200, 200, 200))
+        board.blit(
+            your_text,
+            (SMALL_GRID_POS[0] + (GRID_SIZE * SMALL_CELL_SIZE) // 2 - 60, SMALL_GRID_POS[1] - 40),
+        )
+        draw_grid(*SMALL_GRID_POS, SMALL_CELL_SIZE, surface=board)
+        draw_own_ships_on_small_grid(surface=board)
+        return board
+
+    def draw_marker(self, coord, status, is_enemy):
+        """
+        Replace the marker of one cell on the marker layer and return the
+        screen rect it covers.
+        """
+        row = int(coord[1:]) - 1
+        col = ord(coord[0].upper()) - ord("A")
+        if is_enemy:
+            origin, size = SMALL_GRID_POS, SMALL_CELL_SIZE
+        else:
+            origin, size = BIG_GRID_POS, BIG_CELL_SIZE
+        rect = pygame.Rect(origin[0] + col * size, origin[1] + row * size, size, size)
+
+        # Clipped: the 3 px sink cross would overhang into the next cells
+        self.markers.set_clip(rect)
+        self.markers.fill(MARKER_KEY, rect)
+        draw_move_result(coord, status, is_enemy=is_enemy, surface=self.markers)
+        self.markers.set_clip(None)
+        return rect
+
+    def draw_status(self, your_turn):
+        """
+        Replace the status line on the screen and return the rect to update.
+        """
+        if your_turn:
+            status_text = render_cache.text(
+                "✓ YOUR TURN! Click on opponent board.", "comicsansms", 30, (0, 255, 0), bold=True
+            )
+        else:
+            status_text = render_cache.text(
+                "⏳ Waiting for opponent's move...", "comicsansms", 30, (255, 165, 0), bold=True
+            )
+        rect = status_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 120))
+
+        dirty = rect
+        if self.status_rect is not None:
+            screen.blit(self.board, self.status_rect, self.status_rect)
+            dirty = rect.union(self.status_rect)
+        screen.blit(status_text, rect)
+        self.status_rect = rect
+        return dirty
+
+
+gameplay_view = GameplayView()
+
+# ------------------------------
+# Screen handlers
+# ------------------------------
+def handle_start_screen():
+    """
+    Start screen with background image and music.
+    """
+    background_img = render_cache.transformed(
+        render_cache.image("../assets/images/sea_background.jpg"), (SCREEN_WIDTH, SCREEN_HEIGHT)
+    )
+
+    # Background music
+    try:
+        pygame.mixer.music.load("../assets/sounds/start.mp3")
+        pygame.mixer.music.play(-1)
+    except Exception:
+        pass
+
+    blink = True
+    blink_timer = 0
+    blink_interval = 500
+
+    while True:
+        screen.blit(background_img, (0, 0))
+        current_time = pygame.time.get_ticks()
+
+        for event in poll_events():
+            if event.type == pygame.QUIT or (
+                event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+            ):
+                pygame.mixer.music.stop()
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+                pygame.mixer.music.stop()
+                return "placement"
+
+        # Title
+        title_text = render_cache.text("🛳️ BATTLESHIP 🛳️", "comicsansms", 60, (255, 255, 255), bold=True)
+        screen.blit(
+            title_text,
+            title_text.get_rect(center=(SCREEN_WIDTH // 2, 80)),
+        )
+
+        # Blinking "press to start" text
+        if current_time - blink_timer > blink_interval:
+            blink = not blink
+            blink_timer = current_time
+
+        if blink:
+            start_text = render_cache.text(
+                "▶ Click or press any key to start ◀", "comicsansms", 28, (255, 255, 255), bold=True
+            )
+            screen.blit(
+                start_text,
+                start_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100)),
+            )
+
+        # Footer
+        footer_text = render_cache.text("Press Esc to quit.", "arial", 20, (255, 255, 255))
+        screen.blit(
+            footer_text,
+            footer_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 40)),
+        )
+
+        pygame.display.flip()
+
+        # Nothing moves until the text blinks again
+        next_frame(timeout=max(1, blink_timer + blink_interval + 1 - pygame.time.get_ticks()))
+
+
+def draw_placement_background():
+    """
+    Render the static part of the placement screen (background, title,
+    help text and grid) once into a layer.
+    """
+    layer = pygame.Surface(screen.get_size()).convert()
+    layer.fill((0, 0, 20))
+
+    # Title
+    title_text = render_cache.text("Place Your Ships", "comicsansms", 48, (255, 255, 255), bold=True)
+    layer.blit(title_text, title_text.get_rect(center=(SCREEN_WIDTH // 2, 40)))
+
+    # Help text
+    help_text1 = render_cache.text("1. Drag ships onto the board.", "arial", 20, (200, 200, 200))
+    help_text2 = render_cache.text("2. Press 'R' to rotate the selected ship.", "arial", 20, (200, 200, 200))
+    layer.blit(help_text1, (int(SCREEN_WIDTH * 0.05), int(SCREEN_HEIGHT * 0.1)))
+    layer.blit(
+        help_text2,
+        (int(SCREEN_WIDTH * 0.05), int(SCREEN_HEIGHT * 0.1) + 30),
+    )
+
+    draw_grid(*PLAYER_GRID_POS, surface=layer)
+    return layer
+
+
+placement_background = None
+
+
+def handle_placement_screen():
+    """
+    Ship placement: drag ships to the grid, press START when done.
+    """
+    global start_clicked, start_button_rect, placement_background
+
+    if placement_background is None:
+        placement_background = draw_placement_background()
+    screen.blit(placement_background, (0, 0))
+
+    for event in poll_events():
+        if event.type == pygame.QUIT or (
+            event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+        ):
+            pygame.quit()
+            sys.exit()
+
+        # Rotate selected ship
+        if (
+            not start_clicked
+            and event.type == pygame.KEYDOWN
+            and event.key == pygame.K_r
+        ):
+            for ship in ships:
+                if ship.selected:
+                    original_orientation = ship.orientation
+                    ship.orientation = (
+                        "vertical"
+                        if ship.orientation == "horizontal"
+                        else "horizontal"
+                    )
+                    if is_out_of_bounds(ship) or is_overlapping(ship, ships):
+                        ship.orientation = original_orientation
+
+        # Mouse interactions
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if start_clicked:
+                continue
+
+            x, y = event.pos
+
+            # START button clicked
+            if start_button_rect and start_button_rect.collidepoint((x, y)):
+                start_clicked = True
+
+                # Send ship placements to the server
+                ships_data = []
+                for ship in ships:
+                    cells = get_occupied_cells(ship)
+                    start = index_to_coord(*cells[0])
+                    end = index_to_coord(*cells[-1])
+                    ships_data.append({"start": start, "end": end})
+
+                client.place(ships_data)
+                logger.debug("ships_sent", ships=ships_data)
+
+                if OPPONENT == "ai":
+                    client.ready(opponent="ai", difficulty=AI_DIFFICULTY)
+                else:
+                    client.ready()
+                logger.info("ready_sent", opponent=OPPONENT)
+
+                return "waiting"
+
+            # Select ship
+            clicked_ship = get_ship_at_pos((x, y))
+            if clicked_ship:
+                for ship in ships:
+                    ship.selected = False
+                clicked_ship.selected = True
+            else:
+                # Move selected ship onto grid
+                gx, gy = PLAYER_GRID_POS
+                if gx <= x < gx + GRID_WIDTH and gy <= y < gy + GRID_WIDTH:
+                    col = (x - gx) // CELL_SIZE
+                    row = (y - gy) // CELL_SIZE
+                    for ship in ships:
+                        if ship.selected:
+                            old_x, old_y = ship.x, ship.y
+                            ship.x = gx + col * CELL_SIZE
+                            ship.y = gy + row * CELL_SIZE
+                            if is_out_of_bounds(ship) or is_overlapping(ship, ships):
+                                ship.x, ship.y = old_x, old_y
+                            else:
+                                ship.selected = False
+                            break
+
+    # Draw ships over the grid
+    draw_ships()
+
+    # Info text if all ships placed
+    if is_all_ships_placed():
+        ready_text = render_cache.text("All ships are placed!", "arial", 24, (0, 255, 0))
+        screen.blit(
+            ready_text,
+            (SCREEN_WIDTH // 2 - 120, SCREEN_HEIGHT - 180),
+        )
+
+    # Show START button only when all ships placed
+    if is_all_ships_placed() and not start_clicked:
+        start_button_rect = draw_start_button()
+
+    pygame.display.flip()
+    next_frame()
+    return "placement"
+
+
+def handle_waiting_screen():
+    """
+    Waiting screen shown after sending placements, until the server
+    sends 'start_gameplay'.
+    """
+    for event in poll_events():
+        if event.type == pygame.QUIT or (
+            event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+        ):
+            pygame.quit()
+            sys.exit()
+
+    if game.started:
+        logger.info("screen_changed", screen="gameplay")
+        gameplay_view.enter()
+        return "gameplay"
+
+    screen.fill((0, 0, 20))
+
+    text = render_cache.text("Waiting for opponent...", "comicsansms", 50, (200, 200, 200))
+    screen.blit(
+        text, (SCREEN_WIDTH // 2 - 260, SCREEN_HEIGHT // 2 - 50)
+    )
+
+    # Simple rotating dot animation
+    current_time = pygame.time.get_ticks()
+    angle = (current_time // 10) % 360
+    radius = 30
+    cx, cy = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50
+    vec = pygame.math.Vector2(1, 0).rotate(angle)
+    dx = int(radius * vec.x)
+    dy = int(radius * vec.y)
+    pygame.draw.circle(screen, (0, 128, 255), (cx + dx, cy + dy), 10)
+
+    pygame.display.flip()
+    next_frame(ANIMATION_FPS)
+    return "waiting"
+
+
+def handle_gameplay_screen():
+    """
+    Main gameplay screen: handles turn logic and drawing boards.
+    """
+    if game.game_over:
+        # If a gameover arrived in the listener, switch immediately
+        return "gameover"
+
+    for event in poll_events():
+        if event.type == pygame.QUIT or (
+            event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+        ):
+            pygame.quit()
+            sys.exit()
+
+        # Another window covered ours; the retained frame is gone
+        if event.type == pygame.VIDEOEXPOSE:
+            gameplay_view.invalidate()
+
+        if game.your_turn and event.type == pygame.MOUSEBUTTONDOWN:
+            x, y = event.pos
+            gx, gy = BIG_GRID_POS
+            if gx <= x < gx + BIG_CELL_SIZE * GRID_SIZE and gy <= y < gy + BIG_CELL_SIZE * GRID_SIZE:
+                col = (x - gx) // BIG_CELL_SIZE
+                row = (y - gy) // BIG_CELL_SIZE
+                coord = chr(ord("A") + col) + str(row + 1)
+
+                if coord not in game.your_moves:
+                    client.move(coord)
+                    logger.debug("move_sent", coord=coord)
+                else:
+                    logger.debug("already_targeted", coord=coord)
+
+    # Only what changed since the last frame is redrawn
+    gameplay_view.render()
+
+    # Sleep until input or a server message changes something
+    next_frame()
+    return "gameplay"
+
+
+def handle_gameover_screen(winner):
+    """
+    Game over screen with 'Play Again' and 'Exit' buttons.
+    """
+    logger.info("screen_changed", screen="gameover", winner=winner)
+
+    # Victory music (optional)
+    if winner == PLAYER_NAME:
+        try:
+            pygame.mixer.music.load("../assets/sounds/win.mp3")
+            pygame.mixer.music.play()
+        except Exception:
+            pass
+
+    play_again_rect = pygame.Rect(
+        screen.get_width() // 2 - 150,
+        SCREEN_HEIGHT // 2 + 50,
+        300,
+        80,
+    )
+    exit_rect = pygame.Rect(
+        screen.get_width() // 2 - 150,
+        SCREEN_HEIGHT // 2 + 150,
+        300,
+        80,
+    )
+
+    while True:
+        for event in poll_events():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if play_again_rect.collidepoint(event.pos):
+                    logger.info("play_again")
+                    return "start"
+                elif exit_rect.collidepoint(event.pos):
+                    pygame.quit()
+                    sys.exit()
+
+        screen.fill((10, 10, 50))
+
+        current_time = pygame.time.get_ticks()
+        glow_value = 100 + int(
+            50 * abs(pygame.math.Vector2(1, 0).rotate(current_time // 15 % 360).x)
+        )
+
+        if winner == PLAYER_NAME:
+            result_color = (255, 215, 0)
+            text = "YOU WON!"
+        else:
+            result_color = (200, 200, 200)
+            text = f"{winner} won!"
+
+        text_surface = render_cache.text(text, "comicsansms", 72, result_color, bold=True)
+        text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3))
+
+        glow_color = (
+            min(result_color[0], glow_value),
+            min(result_color[1], glow_value),
+            min(result_color[2], glow_value),
+        )
+        glow_text = render_cache.text(text, "comicsansms", 72, glow_color, bold=True)
+        glow_rect = glow_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3))
+
+        screen.blit(glow_text, glow_rect)
+        screen.blit(text_surface, text_rect)
+
+        # Play Again button
+        pygame.draw.rect(screen, (0, 180, 0), play_again_rect, border_radius=15)
+        pygame.draw.rect(screen, (255, 255, 255), play_again_rect, 3, border_radius=15)
+        play_again_text = render_cache.text("Play Again", "arial", 36, (255, 255, 255))
+        play_again_text_rect = play_again_text.get_rect(center=play_again_rect.center)
+        screen.blit(play_again_text, play_again_text_rect)
+
+        # Exit button
+        pygame.draw.rect(screen, (180, 0, 0), exit_rect, border_radius=15)
+        pygame.draw.rect(screen, (255, 255, 255), exit_rect, 3, border_radius=15)
+        exit_text = render_cache.text("Exit", "arial", 36, (255, 255, 255))
+        exit_text_rect = exit_text.get_rect(center=exit_rect.center)
+        screen.blit(exit_text, exit_text_rect)
+
+        pygame.display.flip()
+        next_frame(ACTIVE_FPS)
+
+
+# ------------------------------
+# Main game loop
+# ------------------------------
+def run(player_name=PLAYER_NAME):
+    """
+    Connect to the server as `player_name` and play until the window is
+    closed.
+    """
+    global PLAYER_NAME, client, game, current_screen
+    PLAYER_NAME = player_name
+    profiling.configure(f"client-{PLAYER_NAME}", PROFILE_DIR, PROFILE_SECONDS)
+    profiling.install_signal()
+
+    client = GameClient(PLAYER_NAME, HOST, PORT, WIRE_PROTOCOL, on_message=on_server_message)
+    client.connect()
+    game = client.state
+
+    while running:
+        if current_screen == "start":
+            reset_ships()
+            current_screen = handle_start_screen()
+
+        elif current_screen == "placement":
+            current_screen = handle_placement_screen()
+
+        elif current_screen == "waiting":
+            current_screen = handle_waiting_screen()
+
+        elif current_screen == "gameplay":
+            result = handle_gameplay_screen()
+            if result != "gameplay":
+                current_screen = result
+
+        elif current_screen == "gameover":
+            current_screen = handle_gameover_screen(game.winner)
+
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else PLAYER_NAME)
@@ -0,0 +1,230 @@
+"""
+Bitboard representation of a fleet.
+
+Cells are numbered 0..99 as row * GRID_SIZE + col, and a set of cells is a
+Python int with bit `cell` set. Every ship is one such mask; the fleet
+also keeps the union of all ships plus the shots and hits taken so far.
+Hit, sink, duplicate-shot and game-over checks are then single integer
+operations instead of list scans.
+"""
+
+GRID_SIZE = 10
+CELLS = GRID_SIZE * GRID_SIZE
+
+# Mask with every cell of the board set
+BOARD_MASK = (1 << CELLS) - 1
+
+MISS = "miss"
+HIT = "hit"
+SINK = "sink"
+
+# Ship sizes of a standard fleet
+FLEET_SIZES = (2, 3, 4, 5)
+
+
+# -------------------------------------------------
+# Cell helpers
+# -------------------------------------------------
+def cell_index(row: int, col: int) -> int:
+    return row * GRID_SIZE + col
+
+
+# cell index -> "B7" style coordinate, and the reverse lookup
+COORDS = [chr(ord("A") + cell % GRID_SIZE) + str(cell // GRID_SIZE + 1) for cell in range(CELLS)]
+COORD_CELLS = {coord: cell for cell, coord in enumerate(COORDS)}
+
+
+def coord_to_cell(coord: str) -> int:
+    """
+    Convert a board coordinate like 'B7' into a cell index.
+    Raises ValueError for anything outside the board.
+    """
+    cell = COORD_CELLS.get(coord)
+    if cell is not None:
+        return cell
+
+    col = ord(coord[0].upper()) - ord("A")
+    row = int(coord[1:]) - 1
+    if not (0 <= row < GRID_SIZE and 0 <= col < GRID_SIZE):
+        raise ValueError(f"Coordinate {coord} is outside the board.")
+    return row * GRID_SIZE + col
+
+
+def cell_to_coord(cell: int) -> str:
+    return COORDS[cell]
+
+
+def mask_cells(mask: int) -> list:
+    """
+    Return the cell indexes set in a mask, lowest first.
+    """
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+
+def cells_mask(cells) -> int:
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+    return mask
+
+
+# -------------------------------------------------
+# Placements
+# -------------------------------------------------
+def _placements(size: int) -> tuple:
+    masks = []
+    for row in range(GRID_SIZE):
+        for col in range(GRID_SIZE - size + 1):
+            masks.append(cells_mask(cell_index(row, col + i) for i in range(size)))
+    for row in range(GRID_SIZE - size + 1):
+        for col in range(GRID_SIZE):
+            masks.append(cells_mask(cell_index(row + i, col) for i in range(size)))
+    return tuple(masks)
+
+
+# ship size -> every legal horizontal and vertical placement as a mask
+PLACEMENTS = {size: _placements(size) for size in range(2, GRID_SIZE + 1)}
+
+# placement mask -> its cells, for code that needs to visit them
+PLACEMENT_CELLS = {mask: tuple(mask_cells(mask)) for masks in PLACEMENTS.values() for mask in masks}
+
+
+# (first cell, last cell) -> placement mask, for every straight ship
+SEGMENTS = {(cells[0], cells[-1]): mask for mask, cells in PLACEMENT_CELLS.items()}
+
+
+class FleetError(ValueError):
+    """
+    A "place" payload that does not describe a legal fleet.
+    """
+
+
+def _ship_cell(coord, number: int) -> int:
+    cell = COORD_CELLS.get(coord.upper()) if isinstance(coord, str) else None
+    if cell is None:
+        raise FleetError(f"Ship {number}: coordinate {coord!r} is outside the board.")
+    return cell
+
+
+def parse_fleet(ships, sizes=FLEET_SIZES) -> list:
+    """
+    Validate the "ships" payload of a "place" message and return one
+    mask per ship.
+
+    Every ship must be a horizontal or vertical run of cells on the board
+    (looked up in SEGMENTS), must not overlap another ship, and the ship
+    sizes must match `sizes`. Raises FleetError describing the first
+    problem found.
+    """
+    if not isinstance(ships, list):
+        raise FleetError("Ships must be a list of start/end coordinates.")
+    if len(ships) != len(sizes):
+        raise FleetError(f"A fleet has {len(sizes)} ships, got {len(ships)}.")
+
+    occupied = 0
+    masks = []
+    for number, ship in enumerate(ships, 1):
+        if not isinstance(ship, dict):
+            raise FleetError(f"Ship {number} needs a start and an end coordinate.")
+        start = _ship_cell(ship.get("start"), number)
+        end = _ship_cell(ship.get("end"), number)
+
+        mask = SEGMENTS.get((min(start, end), max(start, end)))
+        if mask is None:
+            if start == end:
+                raise FleetError(f"Ship {number} ({COORDS[start]}) covers a single cell.")
+            raise FleetError(f"Ship {number} ({COORDS[start]}-{COORDS[end]}) is not horizontal or vertical.")
+        if mask & occupied:
+            raise FleetError(f"Ship {number} ({COORDS[start]}-{COORDS[end]}) overlaps another ship.")
+
+        occupied |= mask
+        masks.append(mask)
+
+    placed = sorted(len(PLACEMENT_CELLS[mask]) for mask in masks)
+    if placed != sorted(sizes):
+        expected = ", ".join(map(str, sorted(sizes)))
+        raise FleetError(f"Ship sizes must be {expected}; got {', '.join(map(str, placed))}.")
+    return masks
+
+
+def random_fleet(rng, sizes=FLEET_SIZES) -> list:
+    """
+    Return ship masks of a random legal fleet (no overlaps), one per size.
+    """
+    occupied = 0
+    ships = []
+    for size in sizes:
+        options = [mask for mask in PLACEMENTS[size] if not mask & occupied]
+        mask = rng.choice(options)
+        occupied |= mask
+        ships.append(mask)
+    return ships
+
+
+# -------------------------------------------------
+# Fleet
+# -------------------------------------------------
+class Fleet:
+    """
+    One player's ships and the shots fired at them.
+    """
+
+    __slots__ = ("ship_masks", "occupied", "shots", "hits", "_owner")
+
+    def __init__(self, ship_masks):
+        self.ship_masks = list(ship_masks)
+
+        # union of all ship masks
+        self.occupied = 0
+        # cell -> index of the ship covering it, -1 for water
+        self._owner = [-1] * CELLS
+        for index, mask in enumerate(self.ship_masks):
+            self.occupied |= mask
+            for cell in mask_cells(mask):
+                self._owner[cell] = index
+
+        # every cell fired at, and the subset that hit a ship
+        self.shots = 0
+        self.hits = 0
+
+    @classmethod
+    def from_positions(cls, ships) -> "Fleet":
+        """
+        Build a fleet from lists of (row, col) positions, one list per ship.
+        """
+        return cls(cells_mask(cell_index(row, col) for row, col in positions) for positions in ships)
+
+    def already_shot(self, cell: int) -> bool:
+        return bool(self.shots >> cell & 1)
+
+    def fire(self, cell: int):
+        """
+        Resolve a shot at `cell` and return (status, sunk_mask).
+
+        status is MISS, HIT or SINK; sunk_mask is the mask of the ship that
+        was just sunk, or 0.
+        """
+        bit = 1 << cell
+        self.shots |= bit
+        if not self.occupied & bit:
+            return MISS, 0
+
+        self.hits |= bit
+        ship = self.ship_masks[self._owner[cell]]
+        if self.hits & ship == ship:
+            return SINK, ship
+        return HIT, 0
+
+    def all_sunk(self) -> bool:
+        return self.hits & self.occupied == self.occupied
+
+    def sunk_ships(self) -> list:
+        """
+        Masks of the ships that have been sunk so far.
+        """
+        return [mask for mask in self.ship_masks if self.hits & mask == mask]
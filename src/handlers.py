@@ -0,0 +1,767 @@
+import itertools
+import queue
+import random
+import secrets
+import threading
+import time
+
+import log
+from ai import DEFAULT_DIFFICULTY, DIFFICULTIES, choose_shot
+from fleet import COORDS, HIT, MISS, SINK, Fleet, FleetError, cell_to_coord, coord_to_cell, mask_cells, parse_fleet, random_fleet
+from journal import EV_END, EV_JOIN, EV_LEAVE, EV_MOVE, EV_PLACE, EV_READY, encode_fleet, encode_move, encode_name
+from match import MatchRegistry
+from matchmaking import MatchmakingQueue
+from metrics import Metrics
+from protocol import PROTOCOL_JSON, encode, negotiate
+from spectators import SPECTATOR_SEAT, SpectatorFeed, encode_once, match_state
+
+logger = log.get_logger("handlers")
+
+# All live matches; every seated connection is bound to one (match, seat)
+registry = MatchRegistry()
+
+# Ready players waiting for an opponent
+matchmaker = MatchmakingQueue()
+
+# Default names for players that join without one
+_guest_ids = itertools.count(1)
+
+# Seconds a player waits in matchmaking before the AI takes the other seat
+# (None: only when they ask for it with "opponent": "ai")
+ai_fallback_after = None
+
+# MatchJournal recording every match event (None: journal disabled)
+journal = None
+
+# Delivers match events to spectators off the players' handlers
+spectator_feed = SpectatorFeed()
+
+# Callable(conn, match_id, message) -> bool that passes a "join" for a match
+# owned by another process there, with the connection (prefork.py);
+# None: every match lives in this process
+forward_join = None
+
+# Every client connection of this process (see handle_connect), for the reaper
+open_connections = set()
+
+# Seconds after which `reap` closes a connection that sent nothing, and
+# ends a match whose player to move has not moved (None: never)
+idle_timeout = 45.0
+turn_timeout = 120.0
+
+# Seconds a player who drops out of a running game keeps their seat for
+# resuming with their token (None: until the turn timeout ends the game)
+resume_grace = 60.0
+
+# Seconds between runs of `reap`
+REAP_INTERVAL = 5.0
+
+
+# -------------------------------------------------
+# Connection interface
+# -------------------------------------------------
+class Connection:
+    """
+    A client connection as seen by the game logic.
+
+    Server engines (thread-per-connection, asyncio) subclass this and
+    implement `write` and `try_send_frame` for their transport, so the
+    message handlers below run unchanged on every engine. `protocol` is
+    the wire encoding negotiated in "join"; until then everything is
+    sent as JSON.
+
+    Frames sent while a batch is open (see `batched`) are held back and
+    written to each connection in one piece when the batch ends, so the
+    "opponent_move" and "turn" of one move leave in a single segment.
+    """
+
+    # Computer players are connections too, but hold no socket
+    is_bot = False
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.protocol = PROTOCOL_JSON
+
+        # Set by "join" and "place"; copied into the match once paired.
+        # The token lets the player take their seat back after a reconnect
+        self.name = None
+        self.token = None
+        self.fleet = None
+
+        # Match this connection spectates (see MatchRegistry.watch)
+        self.watching = None
+
+        # time.monotonic() of the last bytes received; engines update it
+        self.last_seen = time.monotonic()
+
+    def send(self, payload: dict) -> None:
+        self.send_frame(encode(payload, self.protocol))
+
+    def send_frame(self, data: bytes) -> None:
+        frames = _batch.frames
+        if frames is None:
+            self.write(data)
+        elif self in frames:
+            frames[self].append(data)
+        else:
+            frames[self] = [data]
+
+    def write(self, data: bytes) -> None:
+        """
+        Write bytes completely, in order with other writes to this connection.
+        """
+        raise NotImplementedError
+
+    def try_send_frame(self, data: bytes) -> bool:
+        """
+        Write an encoded frame without waiting for the peer; False if the
+        connection cannot take all of it right now.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.addr})"
+
+
+class _Batch(threading.local):
+    # connection -> frames held back until the batch ends (None: no batch)
+    frames = None
+
+
+_batch = _Batch()
+
+
+def batched(task, *args) -> None:
+    """
+    Run `task(*args)` with the frames it sends coalesced per connection,
+    then write them, one write per connection. Nested calls join the
+    batch that is already open.
+    """
+    if _batch.frames is not None:
+        task(*args)
+        return
+    frames = _batch.frames = {}
+    try:
+        task(*args)
+    finally:
+        _batch.frames = None
+        for conn, parts in frames.items():
+            try:
+                conn.write(parts[0] if len(parts) == 1 else b"".join(parts))
+            except Exception as exc:
+                metrics.send_failures += 1
+                logger.warning("send_failed", player=conn.name, addr=conn.addr, error=exc)
+
+
+# -------------------------------------------------
+# Deferred work
+# -------------------------------------------------
+_deferred = queue.Queue()
+_deferred_worker = None
+_deferred_lock = threading.Lock()
+
+
+def _run_deferred() -> None:
+    while True:
+        task = _deferred.get()
+        try:
+            task()
+        except Exception:
+            logger.exception("deferred_task_failed")
+
+
+def defer(task) -> None:
+    """
+    Run `task` soon, after the handler that is currently running has
+    released its locks. The default runs tasks on one background thread;
+    the asyncio engine replaces this with loop.call_soon_threadsafe.
+    """
+    global _deferred_worker
+    if _deferred_worker is None:
+        with _deferred_lock:
+            if _deferred_worker is None:
+                _deferred_worker = threading.Thread(target=_run_deferred, daemon=True)
+                _deferred_worker.start()
+    _deferred.put(task)
+
+
+# -------------------------------------------------
+# AI opponent
+# -------------------------------------------------
+class AIOpponent(Connection):
+    """
+    A computer player sitting in a match seat.
+
+    It receives the same messages as a human; on "turn" it schedules its
+    shot with `defer`, since the message is sent while the match lock is
+    held, and then plays it through the normal "move" handler.
+    """
+
+    is_bot = True
+
+    def __init__(self, difficulty: str = DEFAULT_DIFFICULTY):
+        if difficulty not in DIFFICULTIES:
+            difficulty = DEFAULT_DIFFICULTY
+        super().__init__(("ai", difficulty))
+        self.difficulty = difficulty
+        self.rng = random.Random()
+        self.name = f"Computer ({difficulty})"
+        self.fleet = Fleet(random_fleet(self.rng))
+
+    def send(self, payload: dict) -> None:
+        if payload.get("type") == "turn":
+            defer(self.take_turn)
+
+    def send_frame(self, data: bytes) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def take_turn(self) -> None:
+        match, seat = registry.lookup(self)
+        if match is None:
+            return
+        target = match.fleets[match.opponent_of(seat)]
+        if target is None:
+            return
+        cell = choose_shot(target, self.difficulty, self.rng)
+        batched(handle_move, self, {"type": "move", "coord": COORDS[cell]})
+
+
+# -------------------------------------------------
+# Helper functions
+# -------------------------------------------------
+def send_message(conn: Connection, payload: dict) -> None:
+    """
+    Safely send a message to a client. Spectators get theirs through the
+    spectator feed, in order with the match events.
+    """
+    if conn.watching is not None:
+        spectator_feed.publish((conn,), payload)
+        return
+    try:
+        conn.send(payload)
+    except Exception as exc:
+        metrics.send_failures += 1
+        logger.warning("send_failed", player=conn.name, addr=conn.addr, error=exc)
+
+
+def broadcast(conns, payload: dict) -> None:
+    """
+    Send the same message to several clients, encoding it once per
+    protocol version.
+    """
+    conns = [conn for conn in conns if conn is not None]
+    frames = encode_once(conns, payload)
+    for conn in conns:
+        try:
+            conn.send_frame(frames[conn.protocol])
+        except Exception as exc:
+            metrics.send_failures += 1
+            logger.warning("send_failed", player=conn.name, addr=conn.addr, error=exc)
+
+
+def record(kind: int, match, seat: int, payload: bytes = b"") -> None:
+    """
+    Append a match event to the journal, if one is enabled, and mark the
+    match as changed for the next snapshot.
+    """
+    match.version += 1
+    if journal is not None:
+        journal.append(kind, match.match_id, seat, payload)
+
+
+# -------------------------------------------------
+# Match start
+# -------------------------------------------------
+def start_match(match) -> None:
+    """
+    Notify both seats that gameplay starts and give seat 0 the first turn.
+    """
+    with match.lock:
+        if match.is_started():
+            return
+
+        logger.info("match_started", match=match.match_id, seat0=match.names[0], seat1=match.names[1])
+
+        # Notify clients that gameplay can start
+        for s, c in enumerate(match.seats):
+            send_message(c, {"type": "start_gameplay", "match": match.match_id, "seat": s})
+
+        # Give the first turn to the player in seat 0
+        match.current_turn = 0
+        match.turn_started = time.monotonic()
+        match.version += 1
+        send_message(
+            match.seats[0],
+            {"type": "turn", "message": "Your turn!"},
+        )
+        spectator_feed.publish(match.spectators, match_state(match))
+
+
+def pair_players(first: Connection, second: Connection) -> None:
+    """
+    Open a match for two players paired by the matchmaker and start it.
+    """
+    match = registry.create((first, second))
+    match.ready = [True, True]
+    for seat, conn in enumerate((first, second)):
+        record(EV_JOIN, match, seat, encode_name(conn.name))
+        record(EV_PLACE, match, seat, encode_fleet(conn.fleet))
+        record(EV_READY, match, seat)
+    start_match(match)
+
+
+def run_matchmaking() -> None:
+    """
+    Pair players whose wait allows a wider skill spread, and give players
+    that waited too long an AI opponent. Server engines call this periodically.
+    """
+    batched(_sweep_matchmaking)
+
+
+def _sweep_matchmaking() -> None:
+    for first, second in matchmaker.sweep():
+        pair_players(first, second)
+
+    if ai_fallback_after is not None:
+        for conn in matchmaker.pop_expired(ai_fallback_after):
+            logger.info("ai_fallback", player=conn.name)
+            pair_players(conn, AIOpponent())
+
+
+# -------------------------------------------------
+# Message handlers
+# -------------------------------------------------
+def handle_join(conn: Connection, message: dict) -> None:
+    """
+    Player joins the server, optionally into a specific match. A join
+    with the "token" from an earlier "welcome" resumes that player's seat
+    and is answered with the whole game state in one "state" message.
+    """
+    if forward_join is not None and message.get("match") is not None:
+        if forward_join(conn, message["match"], message):
+            return
+
+    conn.name = message.get("name") or f"Player{next(_guest_ids)}"
+    conn.token = secrets.randbits(64)
+
+    match_id = message.get("match")
+    token = message.get("token")
+    seat = 0
+    if match_id is not None:
+        try:
+            match, seat = registry.join(conn, match_id, token)
+        except ValueError as exc:
+            send_message(conn, {"type": "error", "message": str(exc)})
+            return
+        if token is not None:
+            conn.token = token
+            conn.name = match.names[seat]
+            conn.fleet = match.fleets[seat]
+        record(EV_JOIN, match, seat, encode_name(conn.name))
+        logger.info("player_joined", player=conn.name, match=match_id, seat=seat, resumed=token is not None)
+    else:
+        match_id = 0
+        logger.info("player_joined", player=conn.name)
+
+    # Confirm the seat and the wire protocol, then switch encoders.
+    # Match 0 means the player will be seated by the matchmaker.
+    version = negotiate(message.get("protocol", PROTOCOL_JSON))
+    send_message(
+        conn,
+        {"type": "welcome", "protocol": version, "match": match_id, "seat": seat, "token": conn.token},
+    )
+    conn.protocol = version
+
+    if match_id:
+        if token is not None:
+            with match.lock:
+                if match.is_started():
+                    send_message(conn, resume_state(match, seat))
+        resume_turn(match)
+
+
+def resume_state(match, seat: int) -> dict:
+    """
+    Everything a returning player needs to redraw the game: their fleet,
+    the results of their shots, the opponent's shots at them and whose
+    turn it is. Call with the match lock held.
+    """
+    fleet = match.fleets[seat] or Fleet(())
+    target = match.fleets[match.opponent_of(seat)] or Fleet(())
+
+    ships = []
+    for mask in fleet.ship_masks:
+        cells = mask_cells(mask)
+        ships.append({"start": cell_to_coord(cells[0]), "end": cell_to_coord(cells[-1])})
+
+    sunk = 0
+    for mask in target.sunk_ships():
+        sunk |= mask
+    your_moves = {}
+    for cell in mask_cells(target.shots):
+        bit = 1 << cell
+        your_moves[cell_to_coord(cell)] = SINK if sunk & bit else HIT if target.hits & bit else MISS
+    enemy_moves = [[cell_to_coord(cell), HIT if fleet.hits >> cell & 1 else MISS] for cell in mask_cells(fleet.shots)]
+
+    return {
+        "type": "state",
+        "match": match.match_id,
+        "seat": seat,
+        "your_turn": match.current_turn == seat,
+        "ships": ships,
+        "your_moves": your_moves,
+        "enemy_moves": enemy_moves,
+    }
+
+
+def resume_turn(match) -> None:
+    """
+    Re-send "turn" to whoever is to move when a player returns to a
+    running match (e.g. one restored from a snapshot).
+    """
+    with match.lock:
+        if match.is_started() and match.seats[match.current_turn] is not None:
+            send_message(match.seats[match.current_turn], {"type": "turn", "message": "Your turn!"})
+
+
+def handle_spectate(conn: Connection, message: dict) -> None:
+    """
+    Watch a match without playing. The spectator gets the current state
+    of the match, then every move and the game over.
+    """
+    if registry.lookup(conn)[0] is not None or conn in matchmaker:
+        send_message(conn, {"type": "error", "message": "Players cannot spectate."})
+        return
+    if conn.watching is not None:
+        registry.unwatch(conn)
+
+    match_id = message.get("match")
+    if match_id not in registry.matches:
+        send_message(conn, {"type": "error", "message": f"Match {match_id} does not exist."})
+        return
+
+    # Written straight away rather than with the batch: from here on
+    # the spectator feed writes to this connection
+    version = negotiate(message.get("protocol", PROTOCOL_JSON))
+    try:
+        conn.write(encode({"type": "welcome", "protocol": version, "match": match_id, "seat": SPECTATOR_SEAT}))
+    except Exception as exc:
+        logger.warning("send_failed", addr=conn.addr, error=exc)
+        return
+    conn.protocol = version
+
+    try:
+        match = registry.watch(conn, match_id)
+    except ValueError as exc:
+        send_message(conn, {"type": "error", "message": str(exc)})
+        return
+    with match.lock:
+        spectator_feed.publish((conn,), match_state(match))
+        spectators = len(match.spectators)
+    logger.info("spectator_joined", addr=conn.addr, match=match_id, spectators=spectators)
+
+
+def handle_place(conn: Connection, message: dict) -> None:
+    """
+    Player places ships. Illegal fleets are rejected with an error and
+    leave any earlier placement in force.
+    """
+    try:
+        ships = parse_fleet(message.get("ships"))
+    except FleetError as exc:
+        send_message(conn, {"type": "error", "message": str(exc)})
+        return
+
+    fleet = Fleet(ships)
+    match, seat = registry.lookup(conn)
+    if match is not None:
+        with match.lock:
+            if match.is_started():
+                send_message(conn, {"type": "error", "message": "Ships cannot be moved during a game."})
+                return
+            match.fleets[seat] = fleet
+            record(EV_PLACE, match, seat, encode_fleet(fleet))
+    conn.fleet = fleet
+    logger.debug("ships_placed", player=conn.name)
+
+
+def handle_ready(conn: Connection, message: dict) -> None:
+    """
+    Player is ready to start.
+
+    Players without a match go to the matchmaking queue, or straight
+    into a match against the AI with "opponent": "ai"; players that
+    joined a specific match start once both of its seats are ready.
+    """
+    if conn.fleet is None:
+        send_message(conn, {"type": "error", "message": "Place your ships before getting ready."})
+        return
+
+    match, seat = registry.lookup(conn)
+
+    if match is None and message.get("opponent") == "ai":
+        # A player already waiting for a human gives up that place
+        matchmaker.cancel(conn)
+        if registry.lookup(conn)[0] is not None:
+            return  # paired meanwhile
+        logger.info("player_ready", player=conn.name, opponent="ai")
+        pair_players(conn, AIOpponent(message.get("difficulty", DEFAULT_DIFFICULTY)))
+        return
+
+    if match is None:
+        try:
+            skill = int(message.get("skill", 0))
+        except (TypeError, ValueError):
+            skill = 0
+        logger.info("player_ready", player=conn.name, waiting=len(matchmaker) + 1)
+        pair = matchmaker.enqueue(conn, skill)
+        if pair is not None:
+            pair_players(*pair)
+        return
+
+    with match.lock:
+        match.ready[seat] = True
+        record(EV_READY, match, seat)
+        logger.info("player_ready", player=conn.name, match=match.match_id, ready=sum(match.ready))
+        if not match.is_full() or not all(match.ready):
+            return
+
+    start_match(match)
+
+
+def handle_move(conn: Connection, message: dict) -> None:
+    """
+    Player makes a move (fires at coord).
+    """
+    match, seat = registry.lookup(conn)
+    if match is None:
+        send_message(conn, {"type": "error", "message": "You are not in a match."})
+        return
+
+    with match.lock:
+        # Not this player's turn
+        if seat != match.current_turn:
+            error_payload = {"type": "error", "message": "It is not your turn."}
+            send_message(conn, error_payload)
+            return
+
+        coord = message["coord"]
+        try:
+            cell = coord_to_cell(coord)
+        except (ValueError, IndexError, TypeError):
+            send_message(conn, {"type": "error", "message": f"Invalid coordinate: {coord}"})
+            return
+        # Canonical form ("j10" -> "J10") for the replies and the binary encoders
+        coord = COORDS[cell]
+
+        opponent_seat = match.opponent_of(seat)
+        opponent = match.seats[opponent_seat]
+
+        if opponent is None and match.fleets[opponent_seat] is None:
+            # Opponent left before the game started
+            send_message(
+                conn,
+                {"type": "error", "message": "Opponent is not connected yet."},
+            )
+            return
+
+        fleet = match.fleets[opponent_seat] or Fleet(())
+        if fleet.already_shot(cell):
+            send_message(conn, {"type": "error", "message": f"{coord} was already targeted."})
+            return
+
+        status, sunk_mask = fleet.fire(cell)
+        record(EV_MOVE, match, seat, encode_move(cell, status))
+
+        # Build response for the current player
+        response = {
+            "type": "result",
+            "status": status,
+            "coord": coord,
+        }
+        if status == SINK:
+            response["sunk_coords"] = [cell_to_coord(c) for c in mask_cells(sunk_mask)]
+
+        send_message(conn, response)
+
+        # Notify opponent about the move (one who is away catches up
+        # with the "state" message when they resume)
+        if opponent is not None:
+            opponent_notify = {
+                "type": "opponent_move",
+                "coord": coord,
+                "status": MISS if status == MISS else HIT,
+            }
+            send_message(opponent, opponent_notify)
+
+        # Spectators see the shooter's result
+        spectator_feed.publish(match.spectators, {**response, "type": "spectate_move", "seat": seat})
+
+        # Check if the opponent has any ships left
+        if fleet.all_sunk():
+            gameover_payload = {
+                "type": "gameover",
+                "winner": conn.name,
+            }
+            broadcast(match.seats, gameover_payload)
+            spectator_feed.publish(match.spectators, gameover_payload)
+            record(EV_END, match, seat)
+            logger.info("match_finished", match=match.match_id, winner=conn.name)
+            finished = True
+        else:
+            # Switch turn
+            match.current_turn = opponent_seat
+            match.turn_started = time.monotonic()
+            logger.debug("turn_changed", match=match.match_id, seat=opponent_seat)
+            if opponent is not None:
+                send_message(
+                    opponent,
+                    {"type": "turn", "message": "Your turn!"},
+                )
+            finished = False
+
+    # Release the players outside the match lock (the registry lock is
+    # always taken first)
+    if finished:
+        registry.finish(match)
+
+
+def handle_pong(conn: Connection, message: dict) -> None:
+    """
+    Answer to a heartbeat "ping"; receiving it already refreshed `last_seen`.
+    """
+
+
+# message type -> handler(conn, message)
+HANDLERS = {
+    "join": handle_join,
+    "place": handle_place,
+    "ready": handle_ready,
+    "move": handle_move,
+    "spectate": handle_spectate,
+    "pong": handle_pong,
+}
+
+# Counters and latency histograms of this process (see metrics.py)
+metrics = Metrics(HANDLERS)
+metrics.gauge("matches", "Matches in progress.", lambda: len(registry))
+metrics.gauge("matchmaking_waiting", "Ready players waiting for an opponent.", lambda: len(matchmaker))
+
+
+def handle_message(conn: Connection, message: dict) -> None:
+    """
+    Dispatch one decoded client message to its handler.
+    """
+    logger.debug("message_received", player=conn.name, addr=conn.addr, message=message)
+
+    msg_type = message.get("type")
+    handler = HANDLERS.get(msg_type)
+    if conn.watching is not None and msg_type not in ("spectate", "pong"):
+        send_message(conn, {"type": "error", "message": "Spectators cannot play."})
+        handler = None
+    started = time.perf_counter()
+    if handler is not None:
+        batched(handler, conn, message)
+    metrics.observe_message(msg_type, time.perf_counter() - started)
+
+
+def handle_connect(conn: Connection) -> None:
+    """
+    Register a new connection with the reaper.
+    """
+    open_connections.add(conn)
+
+
+def handle_disconnect(conn: Connection) -> None:
+    """
+    Take a closed connection out of matchmaking and free its seat. The
+    seat of a running game is kept for `resume_grace` seconds instead.
+    """
+    open_connections.discard(conn)
+    if conn.watching is not None:
+        registry.unwatch(conn)
+        return
+    matchmaker.cancel(conn)
+    match, seat = registry.leave(conn)
+    if match is not None:
+        logger.info("player_left", match=match.match_id, seat=seat)
+        record(EV_LEAVE, match, seat)
+
+        # Nobody left to play against the AI (a running game waits for
+        # the player to resume)
+        if not match.is_started() and all(c is None or c.is_bot for c in match.seats):
+            registry.finish(match)
+
+
+# -------------------------------------------------
+# Heartbeats and timeouts
+# -------------------------------------------------
+def reap(now: float = None) -> None:
+    """
+    Ping connections that have been quiet for a third of `idle_timeout`,
+    close those quiet for all of it, and end matches whose player to move
+    let `turn_timeout` pass or whose player who dropped out did not come
+    back within `resume_grace`. Server engines call this every REAP_INTERVAL.
+    """
+    now = time.monotonic() if now is None else now
+
+    if idle_timeout:
+        quiet = [conn for conn in list(open_connections) if now - conn.last_seen >= idle_timeout / 3]
+        pings = encode_once(quiet, {"type": "ping"})
+        for conn in quiet:
+            if now - conn.last_seen >= idle_timeout:
+                logger.info("connection_reaped", player=conn.name, addr=conn.addr, idle=round(now - conn.last_seen))
+                open_connections.discard(conn)
+                conn.close()
+            else:
+                try:
+                    conn.try_send_frame(pings[conn.protocol])
+                except Exception:
+                    pass
+
+    for match in registry.live():
+        if _forfeit_due(match, now) is not None:
+            batched(forfeit_turn, match, now)
+
+
+def _forfeit_due(match, now: float):
+    """
+    The seat that loses `match` by timeout at `now`, or None.
+    """
+    if not match.is_started():
+        return None
+    if resume_grace:
+        for seat, since in enumerate(match.away_since):
+            if since is not None and now - since >= resume_grace:
+                return seat
+    if turn_timeout and now - match.turn_started >= turn_timeout:
+        return match.current_turn
+    return None
+
+
+def forfeit_turn(match, now: float) -> None:
+    """
+    End a match because a player timed out, on their turn or while away;
+    the other seat wins.
+    """
+    with match.lock:
+        seat = _forfeit_due(match, now)
+        if seat is None:
+            return
+        winner_seat = match.opponent_of(seat)
+        winner = match.names[winner_seat]
+        logger.info("turn_timeout", match=match.match_id, seat=seat, winner=winner, away=match.away_since[seat] is not None)
+
+        gameover_payload = {"type": "gameover", "winner": winner}
+        broadcast(match.seats, gameover_payload)
+        spectator_feed.publish(match.spectators, gameover_payload)
+        match.current_turn = None
+        record(EV_END, match, winner_seat)
+
+    registry.finish(match)
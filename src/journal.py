@@ -0,0 +1,282 @@
+"""
+Append-only binary journal of match events.
+
+Every accepted event of a match (a player taking a seat, placing ships,
+getting ready, a move and its result, the end of the game) is appended
+as a small fixed-layout record. Handlers only push a tuple onto a deque;
+a background thread turns everything queued since the last flush into
+one block and appends it to the file, so the journal adds no I/O to the
+request path.
+
+File layout, a sequence of blocks:
+
+    block header   "!2sII"  magic b"BJ", index entries, record bytes
+    block index    "!II"    match id, offset of its first record in
+                            the block (relative to the first record)
+    records        "!BIBB"  kind, match id, seat, payload length,
+                   followed by the payload
+
+A reader memory-maps the file and hops from block header to block
+header; only blocks whose index lists a match are parsed, starting at
+that match's first record. A block cut short by a crash ends the log;
+the writer cuts it off before appending again.
+
+Usage:
+    python journal.py battleship.journal
+    python journal.py battleship.journal --match 3 --moves 20
+"""
+
+import argparse
+import collections
+import mmap
+import os
+import struct
+import threading
+
+import log
+from fleet import COORDS, PLACEMENT_CELLS, SEGMENTS, Fleet
+from match import Match
+
+logger = log.get_logger("journal")
+
+BLOCK_MAGIC = b"BJ"
+BLOCK_HEADER = struct.Struct("!2sII")
+INDEX_ENTRY = struct.Struct("!II")
+RECORD_HEADER = struct.Struct("!BIBB")
+
+# Seconds between flushes of the queued records
+FLUSH_INTERVAL = 0.05
+
+# Record kinds
+EV_JOIN = 1      # payload: player name (UTF-8)
+EV_PLACE = 2     # payload: first and last cell of every ship
+EV_READY = 3     # no payload
+EV_MOVE = 4      # payload: cell, result status code
+EV_END = 5       # seat is the winner; no payload
+EV_LEAVE = 6     # seat left the match; no payload
+
+STATUS_CODES = {"miss": 0, "hit": 1, "sink": 2}
+STATUSES = ("miss", "hit", "sink")
+
+
+# -------------------------------------------------
+# Payload encoding
+# -------------------------------------------------
+def encode_name(name: str) -> bytes:
+    return (name or "").encode("utf-8")[:255]
+
+
+def encode_fleet(fleet) -> bytes:
+    cells = bytearray()
+    for mask in fleet.ship_masks:
+        ship = PLACEMENT_CELLS[mask]
+        cells += bytes((ship[0], ship[-1]))
+    return bytes(cells)
+
+
+def encode_move(cell: int, status: str) -> bytes:
+    return bytes((cell, STATUS_CODES[status]))
+
+
+def decode_fleet(data: bytes) -> Fleet:
+    return Fleet(SEGMENTS[(data[i], data[i + 1])] for i in range(0, len(data), 2))
+
+
+# -------------------------------------------------
+# Writer
+# -------------------------------------------------
+class MatchJournal:
+    """
+    Appends match events to a journal file from a background thread.
+    """
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._drop_partial_block()
+        self._file = open(path, "ab")
+
+        # (kind, match id, seat, payload); deque appends are thread-safe
+        self._pending = collections.deque()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._writer.start()
+
+    def _drop_partial_block(self) -> None:
+        """
+        Truncate a block cut short by a crash; blocks appended after it
+        would never be read.
+        """
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        reader = JournalReader(self.path)
+        length = reader.complete_length()
+        reader.close()
+        if length < size:
+            logger.warning("journal_truncated", path=self.path, dropped=size - length)
+            os.truncate(self.path, length)
+
+    def append(self, kind: int, match_id: int, seat: int, payload: bytes = b"") -> None:
+        self._pending.append((kind, match_id, seat, payload))
+
+    def close(self) -> None:
+        self._stop.set()
+        self._writer.join()
+        self._file.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self) -> None:
+        records = bytearray()
+        first_offsets = {}
+        pending = self._pending
+        while pending:
+            kind, match_id, seat, payload = pending.popleft()
+            first_offsets.setdefault(match_id, len(records))
+            records += RECORD_HEADER.pack(kind, match_id, seat, len(payload))
+            records += payload
+        if not records:
+            return
+
+        block = bytearray(BLOCK_HEADER.pack(BLOCK_MAGIC, len(first_offsets), len(records)))
+        for match_id, offset in first_offsets.items():
+            block += INDEX_ENTRY.pack(match_id, offset)
+        block += records
+        try:
+            self._file.write(block)
+            self._file.flush()
+        except OSError as exc:
+            logger.error("journal_write_failed", path=self.path, error=exc)
+
+
+# -------------------------------------------------
+# Reader
+# -------------------------------------------------
+class JournalReader:
+    """
+    Memory-mapped, read-only view of a journal file.
+    """
+
+    def __init__(self, path: str):
+        # mmap cannot map an empty file
+        self._map = b""
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def blocks(self):
+        """
+        Yield (index, records_start, records_end) for every complete block,
+        where index maps match id -> absolute offset of its first record.
+        """
+        data = self._map
+        pos = 0
+        while pos + BLOCK_HEADER.size <= len(data):
+            magic, entries, length = BLOCK_HEADER.unpack_from(data, pos)
+            start = pos + BLOCK_HEADER.size + entries * INDEX_ENTRY.size
+            end = start + length
+            if magic != BLOCK_MAGIC or end > len(data):
+                return
+            index = {}
+            for i in range(entries):
+                match_id, offset = INDEX_ENTRY.unpack_from(data, pos + BLOCK_HEADER.size + i * INDEX_ENTRY.size)
+                index[match_id] = start + offset
+            yield index, start, end
+            pos = end
+
+    def complete_length(self) -> int:
+        """
+        Offset of the end of the last complete block.
+        """
+        end = 0
+        for _, _, end in self.blocks():
+            pass
+        return end
+
+    def match_ids(self) -> list:
+        ids = set()
+        for index, _, _ in self.blocks():
+            ids.update(index)
+        return sorted(ids)
+
+    def events(self, match_id: int):
+        """
+        Yield (kind, seat, payload) for every record of one match in order.
+        """
+        data = self._map
+        for index, _, end in self.blocks():
+            pos = index.get(match_id)
+            if pos is None:
+                continue
+            while pos < end:
+                kind, record_match, seat, length = RECORD_HEADER.unpack_from(data, pos)
+                pos += RECORD_HEADER.size
+                if record_match == match_id:
+                    yield kind, seat, bytes(data[pos:pos + length])
+                pos += length
+
+    def replay(self, match_id: int, moves: int = None) -> Match:
+        """
+        Rebuild the state of a match after its first `moves` moves (all of
+        them by default). Seats hold no connections in the result.
+        """
+        match = Match(match_id)
+        played = 0
+        for kind, seat, payload in self.events(match_id):
+            if kind == EV_JOIN:
+                match.names[seat] = payload.decode("utf-8", "replace")
+            elif kind == EV_PLACE:
+                match.fleets[seat] = decode_fleet(payload)
+            elif kind == EV_READY:
+                match.ready[seat] = True
+                if all(match.ready):
+                    match.current_turn = 0
+            elif kind == EV_MOVE:
+                if moves is not None and played >= moves:
+                    break
+                match.fleets[match.opponent_of(seat)].fire(payload[0])
+                match.current_turn = match.opponent_of(seat)
+                played += 1
+            elif kind == EV_END:
+                match.current_turn = None
+        return match
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--match", type=int, help="replay this match instead of listing all")
+    parser.add_argument("--moves", type=int, help="stop the replay after this many moves")
+    args = parser.parse_args()
+
+    reader = JournalReader(args.path)
+    try:
+        if args.match is None:
+            for match_id in reader.match_ids():
+                moves = sum(1 for kind, _, _ in reader.events(match_id) if kind == EV_MOVE)
+                print(f"match {match_id}: {moves} moves")
+            return
+
+        match = reader.replay(args.match, args.moves)
+        print(match)
+        for seat, fleet in enumerate(match.fleets):
+            if fleet is None:
+                continue
+            hits = [COORDS[cell] for cell in range(len(COORDS)) if fleet.hits >> cell & 1]
+            print(f"  seat {seat}: {bin(fleet.shots).count('1')} shots taken, hits at {', '.join(hits) or '-'}")
+        turn = "-" if match.current_turn is None else match.names[match.current_turn]
+        print(f"  next turn: {turn}")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
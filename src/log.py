@@ -0,0 +1,224 @@
+"""
+Structured logging with a background writer.
+
+Log calls name an event and attach fields:
+
+    logger = log.get_logger("server")
+    logger.info("player_joined", name=name, match=match_id)
+
+A call below the configured level returns after one integer comparison,
+before anything is formatted or allocated beyond the call itself.
+Enabled records are appended to a bounded queue as raw tuples; a writer
+thread formats them (logfmt text or JSON lines) and writes them out in
+batches, so no console or file I/O happens on the calling thread. When
+the queue is full, records are dropped and counted, and the writer
+reports how many were lost.
+
+DEBUG records can be sampled: with `sample=N` only every Nth debug call
+is kept, for per-message logs under load.
+"""
+
+import atexit
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {number: name.upper() for name, number in LEVELS.items()}
+
+# Records held at most before new ones are dropped
+QUEUE_SIZE = 10000
+
+# Seconds between writer flushes
+FLUSH_INTERVAL = 0.1
+
+# Settings (see configure)
+_threshold = INFO
+_sample = 1
+_format = "text"
+_stream = sys.stderr
+
+# (time, level, logger, event, fields, exc_info) tuples waiting for the writer
+_pending = collections.deque()
+_dropped = 0
+_debug_calls = 0
+
+_writer = None
+_writer_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def configure(level: str = "info", sample: int = 1, fmt: str = "text", path: str = None) -> None:
+    """
+    Set the level, the DEBUG sampling rate, the output format ("text" or
+    "json") and an optional log file (default: stderr).
+    """
+    global _threshold, _sample, _format, _stream
+    _threshold = LEVELS[level]
+    _sample = max(1, sample)
+    _format = fmt
+    if path is not None:
+        _stream = open(path, "a", encoding="utf-8")
+
+
+def add_arguments(parser) -> None:
+    """
+    Add the logging options to a command line parser.
+    """
+    parser.add_argument("--log-level", choices=tuple(LEVELS), default="info")
+    parser.add_argument("--log-sample", type=int, default=1, metavar="N", help="keep every Nth debug record")
+    parser.add_argument("--log-format", choices=("text", "json"), default="text")
+    parser.add_argument("--log-file", metavar="PATH", help="append log records here instead of stderr")
+
+
+def configure_from_args(args) -> None:
+    configure(args.log_level, args.log_sample, args.log_format, args.log_file)
+
+
+class Logger:
+    """
+    Named source of log records.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, level: int) -> bool:
+        return level >= _threshold
+
+    def debug(self, event: str, **fields) -> None:
+        global _debug_calls
+        if _threshold > DEBUG:
+            return
+        _debug_calls += 1
+        if _debug_calls % _sample:
+            return
+        _emit(DEBUG, self.name, event, fields, None)
+
+    def info(self, event: str, **fields) -> None:
+        if _threshold <= INFO:
+            _emit(INFO, self.name, event, fields, None)
+
+    def warning(self, event: str, **fields) -> None:
+        if _threshold <= WARNING:
+            _emit(WARNING, self.name, event, fields, None)
+
+    def error(self, event: str, **fields) -> None:
+        if _threshold <= ERROR:
+            _emit(ERROR, self.name, event, fields, None)
+
+    def exception(self, event: str, **fields) -> None:
+        """
+        Log an ERROR with the traceback of the exception being handled.
+        """
+        if _threshold <= ERROR:
+            _emit(ERROR, self.name, event, fields, sys.exc_info())
+
+
+_loggers = {}
+
+
+def get_logger(name: str) -> Logger:
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers[name] = Logger(name)
+    return logger
+
+
+# -------------------------------------------------
+# Writer
+# -------------------------------------------------
+def _emit(level: int, name: str, event: str, fields: dict, exc_info) -> None:
+    global _dropped
+    if len(_pending) >= QUEUE_SIZE:
+        _dropped += 1
+        return
+    _pending.append((time.time(), level, name, event, fields, exc_info))
+    if _writer is None:
+        _start_writer()
+    if level >= ERROR:
+        _wake.set()
+
+
+def _start_writer() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run, name="log-writer", daemon=True)
+            _writer.start()
+
+
+def _run() -> None:
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        flush()
+
+
+def _value(value) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    if not text or " " in text or '"' in text or "=" in text:
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+def _format_record(record) -> str:
+    created, level, name, event, fields, exc_info = record
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(created)) + f".{int(created % 1 * 1000):03d}"
+    if _format == "json":
+        data = {"time": stamp, "level": LEVEL_NAMES[level], "logger": name, "event": event}
+        data.update({key: value if isinstance(value, (int, float, str, bool, type(None))) else repr(value) for key, value in fields.items()})
+        if exc_info is not None:
+            data["traceback"] = "".join(traceback.format_exception(*exc_info))
+        return json.dumps(data, ensure_ascii=False)
+
+    line = f"{stamp} {LEVEL_NAMES[level]:<7} {name} {event}"
+    if fields:
+        line += " " + " ".join(f"{key}={_value(value)}" for key, value in fields.items())
+    if exc_info is not None:
+        line += "\n" + "".join(traceback.format_exception(*exc_info)).rstrip()
+    return line
+
+
+def flush() -> None:
+    """
+    Write out every queued record.
+    """
+    global _dropped
+    lines = []
+    while _pending:
+        try:
+            lines.append(_format_record(_pending.popleft()))
+        except Exception as exc:
+            lines.append(f"log record could not be formatted: {exc!r}")
+    if _dropped:
+        lost, _dropped = _dropped, 0
+        lines.append(_format_record((time.time(), WARNING, "log", "records_dropped", {"count": lost}, None)))
+    if lines:
+        try:
+            _stream.write("\n".join(lines) + "\n")
+            _stream.flush()
+        except (OSError, ValueError):
+            pass
+
+
+def _after_fork() -> None:
+    # The writer thread does not survive fork; start a new one on demand
+    global _writer, _writer_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(flush)
@@ -0,0 +1,270 @@
+import itertools
+import threading
+import time
+
+from fleet import Fleet
+
+# Number of seats in a match; seat 0 always moves first.
+SEATS = 2
+
+
+class Match:
+    """
+    State of a single game: who sits in which seat, their fleets,
+    readiness and whose turn it is.
+
+    Seats are fixed when the match is created, so the turn order never has to be
+    recomputed from player names.
+    """
+
+    def __init__(self, match_id: int):
+        self.match_id = match_id
+        self.lock = threading.Lock()
+
+        # seat index -> client connection / player name
+        self.seats = [None] * SEATS
+        self.names = [None] * SEATS
+
+        # seat index -> Fleet (ships and the shots fired at them)
+        self.fleets = [None] * SEATS
+
+        self.ready = [False] * SEATS
+
+        # seat index of the player whose turn it is (None until the game starts)
+        self.current_turn = None
+
+        # time.monotonic() when the current turn began (or the match was
+        # created or restored), for the turn-inactivity timeout
+        self.turn_started = time.monotonic()
+
+        # seat index -> resume token of the player holding it (None: free
+        # for anyone), and time.monotonic() since when a player who left a
+        # running game has been away
+        self.tokens = [None] * SEATS
+        self.away_since = [None] * SEATS
+
+        # Connections watching the match. Replaced, never mutated, so the
+        # spectator feed can deliver to a tuple taken under the lock
+        self.spectators = ()
+
+        # Bumped on every change, so snapshots only re-encode matches
+        # that moved on since the last one
+        self.version = 0
+
+    def is_full(self) -> bool:
+        return all(conn is not None for conn in self.seats)
+
+    def is_empty(self) -> bool:
+        return all(conn is None for conn in self.seats)
+
+    def is_started(self) -> bool:
+        return self.current_turn is not None
+
+    def free_seat(self, token: int = None):
+        """
+        Return the index of an empty seat, or None if there is none.
+        Without a token only seats nobody holds qualify; with one, only
+        the empty seat that token was issued for.
+        """
+        for seat, conn in enumerate(self.seats):
+            if conn is None and self.tokens[seat] == token:
+                return seat
+        return None
+
+    @staticmethod
+    def opponent_of(seat: int) -> int:
+        return 1 - seat
+
+    def __repr__(self) -> str:
+        return f"Match({self.match_id}, {self.names})"
+
+
+def fresh_fleet(fleet):
+    """
+    An undamaged copy of a fleet a player brings into a new match (a
+    connection keeps its placement from one game to the next).
+    """
+    return Fleet(fleet.ship_masks) if fleet is not None else None
+
+
+class MatchRegistry:
+    """
+    All live matches of the server, and the connection -> (match, seat)
+    binding for every seated player.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._id_step = 1
+
+        # match id -> Match
+        self.matches = {}
+
+        # client connection -> (Match, seat)
+        self._bindings = {}
+
+    def create(self, conns) -> Match:
+        """
+        Open a new match with the given connections in seat order.
+        Each connection brings its `name`, its resume `token` and the
+        ships of the `fleet` it placed, which start undamaged in every match.
+        """
+        with self._lock:
+            match = Match(next(self._ids))
+            for seat, conn in enumerate(conns):
+                match.seats[seat] = conn
+                match.names[seat] = conn.name
+                match.tokens[seat] = conn.token
+                match.fleets[seat] = fresh_fleet(conn.fleet)
+                self._bindings[conn] = (match, seat)
+            self.matches[match.match_id] = match
+            return match
+
+    def restore(self, match) -> None:
+        """
+        Add a match recovered from a snapshot. Occupied seats are bound
+        again, players' seats wait for them to resume, and new match ids
+        continue after its id.
+        """
+        with self._lock:
+            self.matches[match.match_id] = match
+            for seat, conn in enumerate(match.seats):
+                if conn is not None:
+                    self._bindings[conn] = (match, seat)
+                elif match.tokens[seat] is not None:
+                    match.away_since[seat] = time.monotonic()
+        self.advance_ids(match.match_id)
+
+    def advance_ids(self, past: int) -> None:
+        """
+        Make sure new match ids are greater than `past`.
+        """
+        with self._lock:
+            start = next(self._ids)
+            while start <= past:
+                start += self._id_step
+            self._ids = itertools.count(start, self._id_step)
+
+    def share_ids(self, index: int, count: int) -> None:
+        """
+        Hand out only ids with (id - 1) % count == index, so the registries
+        of `count` processes never reuse each other's ids and every id
+        names the process that owns the match.
+        """
+        with self._lock:
+            self._id_step = count
+            self._ids = itertools.count(index + 1, count)
+
+    def live(self) -> list:
+        """
+        Return the current matches.
+        """
+        with self._lock:
+            return list(self.matches.values())
+
+    def join(self, conn, match_id: int, token: int = None):
+        """
+        Seat a connection in an existing match and return (match, seat).
+        With a resume token the connection takes back the seat it was
+        issued for, with that player's name; otherwise it takes a free
+        seat under its own name and token.
+        Raises ValueError when the match does not exist or has no such seat.
+        """
+        with self._lock:
+            if conn in self._bindings:
+                return self._bindings[conn]
+
+            match = self.matches.get(match_id)
+            if match is None:
+                raise ValueError(f"Match {match_id} does not exist.")
+            seat = match.free_seat(token)
+            if seat is None:
+                if token is not None:
+                    raise ValueError("Resume token is not valid for this match.")
+                raise ValueError(f"Match {match_id} is full.")
+
+            with match.lock:
+                match.seats[seat] = conn
+                match.away_since[seat] = None
+                if token is None:
+                    match.names[seat] = conn.name
+                    match.tokens[seat] = conn.token
+                    match.fleets[seat] = fresh_fleet(conn.fleet)
+            self._bindings[conn] = (match, seat)
+            return match, seat
+
+    def watch(self, conn, match_id: int) -> Match:
+        """
+        Add a connection to the spectators of a match and return the match.
+        Raises ValueError when the match does not exist.
+        """
+        with self._lock:
+            match = self.matches.get(match_id)
+            if match is None:
+                raise ValueError(f"Match {match_id} does not exist.")
+            with match.lock:
+                match.spectators += (conn,)
+            conn.watching = match
+            return match
+
+    def unwatch(self, conn) -> None:
+        """
+        Stop a connection from watching its match.
+        """
+        with self._lock:
+            match = conn.watching
+            if match is None:
+                return
+            with match.lock:
+                match.spectators = tuple(c for c in match.spectators if c is not conn)
+            conn.watching = None
+
+    def finish(self, match) -> None:
+        """
+        Remove a finished match and release its players, who may then
+        queue for a new game on the same connection, and its spectators.
+        """
+        with self._lock:
+            for conn in match.seats:
+                if conn is not None:
+                    self._bindings.pop(conn, None)
+            for conn in match.spectators:
+                conn.watching = None
+            match.spectators = ()
+            self.matches.pop(match.match_id, None)
+
+    def lookup(self, conn):
+        """
+        Return (match, seat) for a seated connection, or (None, None).
+        """
+        return self._bindings.get(conn, (None, None))
+
+    def leave(self, conn):
+        """
+        Release the seat held by a connection and return the (match, seat)
+        it was bound to. In a running game the seat is held for the player
+        to resume; otherwise it is freed and empty matches are removed.
+        """
+        with self._lock:
+            match, seat = self._bindings.pop(conn, (None, None))
+            if match is None:
+                return None, None
+
+            with match.lock:
+                match.seats[seat] = None
+                if match.is_started():
+                    match.away_since[seat] = time.monotonic()
+                    return match, seat
+                match.names[seat] = None
+                match.tokens[seat] = None
+                match.fleets[seat] = None
+                match.ready[seat] = False
+
+            if match.is_empty():
+                self.matches.pop(match.match_id, None)
+
+            return match, seat
+
+    def __len__(self) -> int:
+        return len(self.matches)
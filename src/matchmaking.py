@@ -0,0 +1,177 @@
+import collections
+import threading
+import time
+
+# Seconds between sweeps that pair long waits across skill buckets
+SWEEP_INTERVAL = 1.0
+
+
+class Ticket:
+    """
+    A ready player waiting for an opponent.
+    """
+
+    __slots__ = ("conn", "bucket", "enqueued_at", "active")
+
+    def __init__(self, conn, bucket: int, enqueued_at: float):
+        self.conn = conn
+        self.bucket = bucket
+        self.enqueued_at = enqueued_at
+        self.active = True
+
+
+class MatchmakingQueue:
+    """
+    Pairs ready players in arrival order.
+
+    Players are grouped into skill buckets of `bucket_width` rating points,
+    each bucket a FIFO deque, so enqueueing and pairing are O(1). A player
+    is only paired inside their own bucket at first; every `widen_after`
+    seconds of waiting lets them accept an opponent one bucket further away,
+    up to `max_spread` buckets. widen_after=0 pairs across any spread
+    immediately (fastest matches); a large value favours even matches.
+
+    Cancelled tickets are left in their deque and skipped when they reach
+    the front, so leaving the queue is O(1) as well.
+    """
+
+    def __init__(self, bucket_width: int = 100, widen_after: float = 5.0, max_spread: int = 3, clock=time.monotonic):
+        self.bucket_width = max(1, bucket_width)
+        self.widen_after = widen_after
+        self.max_spread = max_spread
+        self.clock = clock
+
+        self._lock = threading.Lock()
+
+        # bucket -> deque of Ticket, oldest first
+        self._buckets = collections.defaultdict(collections.deque)
+
+        # conn -> active Ticket
+        self._tickets = {}
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, conn) -> bool:
+        return conn in self._tickets
+
+    def bucket_of(self, skill) -> int:
+        return int(skill) // self.bucket_width
+
+    def spread(self, ticket: Ticket, now: float) -> int:
+        """
+        How many buckets away from its own a ticket may be paired right now.
+        """
+        if self.widen_after <= 0:
+            return self.max_spread
+        return min(self.max_spread, int((now - ticket.enqueued_at) / self.widen_after))
+
+    def enqueue(self, conn, skill=0):
+        """
+        Add a ready player. Returns (first, second) connections if they could
+        be paired straight away, the earlier arrival first; otherwise None.
+        """
+        with self._lock:
+            if conn in self._tickets:
+                return None
+
+            now = self.clock()
+            ticket = Ticket(conn, self.bucket_of(skill), now)
+
+            opponent = self._pop_head(ticket.bucket)
+            if opponent is None:
+                for distance in range(1, self.max_spread + 1):
+                    for bucket in (ticket.bucket - distance, ticket.bucket + distance):
+                        head = self._head(bucket)
+                        if head is not None and self.spread(head, now) >= distance:
+                            opponent = self._pop_head(bucket)
+                            break
+                    if opponent is not None:
+                        break
+
+            if opponent is not None:
+                return opponent.conn, conn
+
+            self._buckets[ticket.bucket].append(ticket)
+            self._tickets[conn] = ticket
+            return None
+
+    def cancel(self, conn) -> bool:
+        """
+        Remove a waiting player (e.g. on disconnect).
+        """
+        with self._lock:
+            ticket = self._tickets.pop(conn, None)
+            if ticket is None:
+                return False
+            ticket.active = False
+            return True
+
+    def sweep(self) -> list:
+        """
+        Pair players whose wait has widened their acceptable spread enough
+        to reach a neighbouring bucket. Call this periodically.
+        Returns a list of (first, second) connection pairs.
+        """
+        pairs = []
+        with self._lock:
+            now = self.clock()
+            for bucket in sorted(self._buckets):
+                while True:
+                    head = self._head(bucket)
+                    if head is None:
+                        break
+                    reach = self.spread(head, now)
+                    partner = None
+                    for distance in range(1, reach + 1):
+                        for other in (bucket - distance, bucket + distance):
+                            if self._head(other) is not None:
+                                partner = other
+                                break
+                        if partner is not None:
+                            break
+                    if partner is None:
+                        break
+                    first = self._pop_head(bucket)
+                    second = self._pop_head(partner)
+                    if second.enqueued_at < first.enqueued_at:
+                        first, second = second, first
+                    pairs.append((first.conn, second.conn))
+
+            # Drop buckets that only held cancelled tickets
+            for bucket in [b for b, queue in self._buckets.items() if not queue]:
+                del self._buckets[bucket]
+        return pairs
+
+    def pop_expired(self, max_wait: float) -> list:
+        """
+        Remove and return the connections that have waited longer than
+        `max_wait` seconds, oldest first within each bucket.
+        """
+        expired = []
+        with self._lock:
+            deadline = self.clock() - max_wait
+            for bucket in list(self._buckets):
+                while True:
+                    head = self._head(bucket)
+                    if head is None or head.enqueued_at > deadline:
+                        break
+                    expired.append(self._pop_head(bucket).conn)
+        return expired
+
+    def _head(self, bucket: int):
+        queue = self._buckets.get(bucket)
+        if not queue:
+            return None
+        while queue and not queue[0].active:
+            queue.popleft()
+        return queue[0] if queue else None
+
+    def _pop_head(self, bucket: int):
+        ticket = self._head(bucket)
+        if ticket is None:
+            return None
+        self._buckets[bucket].popleft()
+        ticket.active = False
+        del self._tickets[ticket.conn]
+        return ticket
@@ -0,0 +1,134 @@
+"""
+Server metrics in Prometheus text exposition format.
+
+Recording is plain integer and float arithmetic on preallocated objects
+(a histogram observation is one bisect and two additions), so it stays
+on permanently; a few hundred nanoseconds per event. Updates are not
+locked: under the GIL a concurrent increment can very rarely be lost,
+which is acceptable for monitoring.
+
+`serve(port)` exposes GET /metrics from a background HTTP thread.
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "battleship"
+
+# Upper bounds (seconds) of the handler latency buckets
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.1, 1.0)
+
+# Label used for message types the server does not know, so clients
+# cannot create unbounded label sets
+OTHER = "other"
+
+
+class Histogram:
+    """
+    Latency distribution with fixed buckets.
+    """
+
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+
+class Metrics:
+    """
+    Counters, gauges and histograms of one server process.
+    """
+
+    def __init__(self, message_types=()):
+        self.message_types = set(message_types)
+        self.messages = {name: 0 for name in (*message_types, OTHER)}
+        self.latency = {name: Histogram() for name in (*message_types, OTHER)}
+
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.send_failures = 0
+        self.connections = 0
+
+        # name -> (help, callable) for gauges read at scrape time
+        self.gauges = {}
+
+    def observe_message(self, msg_type: str, seconds: float) -> None:
+        if msg_type not in self.message_types:
+            msg_type = OTHER
+        self.messages[msg_type] += 1
+        self.latency[msg_type].observe(seconds)
+
+    def gauge(self, name: str, help_text: str, read) -> None:
+        self.gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+                lines.append(f"{PREFIX}_{name}{suffix}{label_text} {value}")
+
+        metric(
+            "messages_total", "counter", "Client messages handled, by type.",
+            [("", (("type", t),), n) for t, n in sorted(self.messages.items())],
+        )
+
+        samples = []
+        for msg_type, histogram in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                samples.append(("_bucket", (("type", msg_type), ("le", repr(bound))), cumulative))
+            cumulative += histogram.counts[-1]
+            samples.append(("_bucket", (("type", msg_type), ("le", "+Inf")), cumulative))
+            samples.append(("_sum", (("type", msg_type),), histogram.total))
+            samples.append(("_count", (("type", msg_type),), cumulative))
+        metric("handler_seconds", "histogram", "Time spent in message handlers, by type.", samples)
+
+        metric("received_bytes_total", "counter", "Bytes read from client sockets.", [("", (), self.bytes_in)])
+        metric("sent_bytes_total", "counter", "Bytes written to client sockets.", [("", (), self.bytes_out)])
+        metric("send_failures_total", "counter", "Messages that could not be sent.", [("", (), self.send_failures)])
+        metric("connections", "gauge", "Open client connections.", [("", (), self.connections)])
+        for name, (help_text, read) in sorted(self.gauges.items()):
+            metric(name, "gauge", help_text, [("", (), read())])
+
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def serve(metrics: Metrics, port: int, host: str = "localhost") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics on host:port from a daemon thread.
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
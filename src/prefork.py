@@ -0,0 +1,366 @@
+"""
+Multi-process launcher: N asyncio workers sharing one port.
+
+Every worker runs the asyncio engine with its own match registry and
+listens on PORT with SO_REUSEPORT, so the kernel spreads new connections
+across them and game logic runs on N cores instead of one.
+
+Matchmaking is the only thing that needs a global view. Workers forward
+ready players to this launcher process as tickets; the launcher runs the
+usual MatchmakingQueue over all of them and tells workers what to do
+with a pair:
+
+    same worker        "pair": start the match there
+    different workers  "handoff": the second player's worker passes the
+                       socket (SCM_RIGHTS over a Unix datagram socket)
+                       with the player's name, protocol, fleet and any
+                       unread bytes to the first player's worker, which
+                       adopts it and starts the match
+
+After that both players are served by one process; clients never notice.
+
+Each worker hands out its own series of match ids ((id - 1) % workers is
+the worker index). A "join" for a specific match, e.g. a player resuming
+after a dropped connection, may arrive at any worker; it is handed to the
+worker that owns the match the same way, and replayed there.
+Linux only (SO_REUSEPORT, fork, fd passing).
+
+Usage:
+    python prefork.py --workers 4
+"""
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import socket
+import time
+
+import aio_server
+import handlers
+import log
+import profiling
+from aio_server import StreamConnection
+from fleet import Fleet
+from handlers import AIOpponent, pair_players
+from matchmaking import SWEEP_INTERVAL, MatchmakingQueue
+from protocol import FrameDecoder, encode
+
+logger = log.get_logger("prefork")
+
+HOST = "localhost"
+PORT = 5001
+
+# Largest handoff datagram: player state plus a partial frame
+MAX_HANDOFF = 64 * 1024 + 1024
+
+
+# -------------------------------------------------
+# Worker side
+# -------------------------------------------------
+class RemoteMatchmaker:
+    """
+    Stands in for MatchmakingQueue inside a worker. Ready players get a
+    ticket that is sent to the launcher, which does the pairing.
+    """
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self._ids = itertools.count(1)
+
+        # ticket id -> (conn, skill), and conn -> ticket id
+        self._tickets = {}
+        self._ticket_of = {}
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, conn) -> bool:
+        return conn in self._ticket_of
+
+    def enqueue(self, conn, skill=0):
+        if conn in self._ticket_of:
+            return None
+        ticket = next(self._ids)
+        self._tickets[ticket] = (conn, skill)
+        self._ticket_of[conn] = ticket
+        self.pipe.send(("ready", ticket, int(skill)))
+        return None
+
+    def cancel(self, conn) -> bool:
+        ticket = self._ticket_of.pop(conn, None)
+        if ticket is None:
+            return False
+        del self._tickets[ticket]
+        self.pipe.send(("cancel", ticket))
+        return True
+
+    def sweep(self) -> list:
+        return []
+
+    def pop_expired(self, max_wait: float) -> list:
+        return []
+
+    def take(self, ticket: int):
+        """
+        Remove a ticket paired by the launcher; returns (conn, skill), or
+        (None, 0) if the player left in the meantime.
+        """
+        conn, skill = self._tickets.pop(ticket, (None, 0))
+        if conn is not None:
+            del self._ticket_of[conn]
+        return conn, skill
+
+
+class Worker:
+    """
+    Launcher commands and socket handoffs of one worker process.
+    """
+
+    def __init__(self, index: int, pipe, inbox: socket.socket, outboxes):
+        self.index = index
+        self.pipe = pipe
+        self.inbox = inbox
+        self.outboxes = outboxes
+        self.matchmaker = RemoteMatchmaker(pipe)
+
+    async def serve(self, host: str, port: int) -> None:
+        handlers.matchmaker = self.matchmaker
+        handlers.registry.share_ids(self.index, len(self.outboxes))
+        handlers.forward_join = self.forward_join
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.pipe.fileno(), self.on_command)
+        loop.add_reader(self.inbox.fileno(), self.on_handoff)
+        logger.info("worker_started", worker=self.index, pid=os.getpid())
+        await aio_server.serve(host, port, reuse_port=True)
+
+    def on_command(self) -> None:
+        command, ticket, *rest = self.pipe.recv()
+
+        if command == "pair":
+            first, first_skill = self.matchmaker.take(ticket)
+            second, second_skill = self.matchmaker.take(rest[0])
+            if first is not None and second is not None:
+                pair_players(first, second)
+            elif first is not None:
+                self.matchmaker.enqueue(first, first_skill)
+            elif second is not None:
+                self.matchmaker.enqueue(second, second_skill)
+
+        elif command == "handoff":
+            conn, skill = self.matchmaker.take(ticket)
+            target, partner = rest
+            if conn is None:
+                self.pipe.send(("requeue", target, partner))
+                return
+            self.hand_off(conn, skill, target, partner)
+
+        elif command == "requeue":
+            conn, skill = self.matchmaker.take(ticket)
+            if conn is not None:
+                self.matchmaker.enqueue(conn, skill)
+
+        elif command == "ai":
+            conn, _ = self.matchmaker.take(ticket)
+            if conn is not None:
+                logger.info("ai_fallback", player=conn.name)
+                pair_players(conn, AIOpponent())
+
+    def forward_join(self, conn: StreamConnection, match_id, message: dict) -> bool:
+        """
+        Pass a connection joining a match of another worker to that worker,
+        which replays the "join". Returns False for matches of this worker.
+        """
+        if not isinstance(match_id, int) or match_id < 1:
+            return False
+        owner = (match_id - 1) % len(self.outboxes)
+        if owner == self.index:
+            return False
+        logger.debug("join_forwarded", worker=self.index, owner=owner, match=match_id)
+        self.hand_off(conn, 0, owner, None, encode(message))
+        return True
+
+    def hand_off(self, conn: StreamConnection, skill: int, target: int, partner, replay: bytes = b"") -> None:
+        """
+        Stop reading from `conn` and pass its socket to worker `target`,
+        where it is paired with ticket `partner` (None: not queued).
+        `replay` holds frames the target handles first, followed by the
+        messages this worker decoded but did not handle and any unread
+        bytes.
+        """
+
+        def send(decoder: FrameDecoder) -> None:
+            fd = os.dup(conn.writer.get_extra_info("socket").fileno())
+            fleet = conn.fleet.ship_masks if conn.fleet is not None else None
+            unhandled = b"".join(encode(message) for message in conn.unhandled)
+            pending = replay + unhandled + decoder.take_pending()
+            state = (partner, skill, conn.name, conn.token, conn.protocol, fleet, pending)
+            try:
+                socket.send_fds(self.outboxes[target], [pickle.dumps(state)], [fd])
+            finally:
+                os.close(fd)
+            # Our descriptor only; the socket stays open in the target
+            conn.writer.transport.abort()
+
+        conn.detach = send
+        conn.writer.transport.pause_reading()
+        conn.reader.feed_eof()
+
+    def on_handoff(self) -> None:
+        data, fds, _, _ = socket.recv_fds(self.inbox, MAX_HANDOFF, 1)
+        if fds:
+            asyncio.ensure_future(self.adopt(pickle.loads(data), socket.socket(fileno=fds[0])))
+
+    async def adopt(self, state, sock: socket.socket) -> None:
+        partner, skill, name, token, protocol, fleet, pending = state
+        sock.setblocking(False)
+        reader, writer = await asyncio.open_connection(sock=sock)
+
+        conn = StreamConnection(writer, reader)
+        conn.name = name
+        conn.token = token
+        conn.protocol = protocol
+        conn.fleet = Fleet(fleet) if fleet is not None else None
+        decoder = FrameDecoder()
+        messages = decoder.feed(pending)
+        logger.debug("connection_adopted", worker=self.index, player=name)
+
+        if partner is not None:
+            first, _ = self.matchmaker.take(partner)
+            if first is not None:
+                pair_players(first, conn)
+            else:
+                self.matchmaker.enqueue(conn, skill)
+
+        aio_server.dispatch(conn, messages)
+        await aio_server.handle_client(reader, writer, conn, decoder)
+
+
+def run_worker(index: int, host: str, port: int, pipe, inbox, outboxes) -> None:
+    profiling.configure(name=f"worker{index}")
+    profiling.install_signal()
+    worker = Worker(index, pipe, inbox, outboxes)
+    try:
+        asyncio.run(worker.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+# -------------------------------------------------
+# Launcher side
+# -------------------------------------------------
+class Launcher:
+    """
+    Pairs the tickets of all workers with one MatchmakingQueue.
+    Queue entries are (worker index, ticket id) tuples.
+    """
+
+    def __init__(self, pipes, matchmaker: MatchmakingQueue, ai_after: float = None):
+        self.pipes = pipes
+        self.matchmaker = matchmaker
+        self.ai_after = ai_after
+
+    def handle(self, worker: int, message) -> None:
+        command, ticket, *rest = message
+        if command == "ready":
+            pair = self.matchmaker.enqueue((worker, ticket), rest[0])
+            if pair is not None:
+                self.dispatch(*pair)
+        elif command == "cancel":
+            self.matchmaker.cancel((worker, ticket))
+        elif command == "requeue":
+            # The partner of a failed handoff goes back into the queue
+            self.pipes[ticket].send(("requeue", rest[0]))
+
+    def dispatch(self, first, second) -> None:
+        (first_worker, first_ticket), (second_worker, second_ticket) = first, second
+        if first_worker == second_worker:
+            self.pipes[first_worker].send(("pair", first_ticket, second_ticket))
+        else:
+            self.pipes[second_worker].send(("handoff", second_ticket, first_worker, first_ticket))
+
+    def sweep(self) -> None:
+        for first, second in self.matchmaker.sweep():
+            self.dispatch(first, second)
+        if self.ai_after is not None:
+            for worker, ticket in self.matchmaker.pop_expired(self.ai_after):
+                self.pipes[worker].send(("ai", ticket))
+
+    def run(self) -> None:
+        workers = {pipe: index for index, pipe in enumerate(self.pipes)}
+        next_sweep = time.monotonic() + SWEEP_INTERVAL
+        while workers:
+            timeout = max(0.0, next_sweep - time.monotonic())
+            for pipe in multiprocessing.connection.wait(list(workers), timeout):
+                try:
+                    self.handle(workers[pipe], pipe.recv())
+                except EOFError:
+                    logger.error("worker_exited", worker=workers.pop(pipe))
+            if time.monotonic() >= next_sweep:
+                self.sweep()
+                next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Battleship game server, one asyncio worker per core")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skill-bucket", type=int, default=100)
+    parser.add_argument("--widen-after", type=float, default=5.0)
+    parser.add_argument("--ai-after", type=float, default=None)
+    parser.add_argument("--idle-timeout", type=float, default=handlers.idle_timeout)
+    parser.add_argument("--turn-timeout", type=float, default=handlers.turn_timeout)
+    parser.add_argument("--resume-grace", type=float, default=handlers.resume_grace)
+    log.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    log.configure_from_args(args)
+    profiling.configure_from_args(args, "launcher")
+
+    # Inherited by the forked workers
+    handlers.idle_timeout = args.idle_timeout
+    handlers.turn_timeout = args.turn_timeout
+    handlers.resume_grace = args.resume_grace
+
+    context = multiprocessing.get_context("fork")
+
+    # One datagram socket pair per worker: it receives handed-off sockets
+    # on the first end, every other worker sends to the second
+    mailboxes = [socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM) for _ in range(args.workers)]
+    outboxes = [send_end for _, send_end in mailboxes]
+
+    pipes = []
+    processes = []
+    for index in range(args.workers):
+        parent_end, child_end = context.Pipe()
+        process = context.Process(
+            target=run_worker,
+            args=(index, args.host, args.port, child_end, mailboxes[index][0], outboxes),
+            daemon=True,
+        )
+        process.start()
+        pipes.append(parent_end)
+        processes.append(process)
+
+    logger.info("listening", host=args.host, port=args.port, workers=args.workers)
+    launcher = Launcher(
+        pipes,
+        MatchmakingQueue(bucket_width=args.skill_bucket, widen_after=args.widen_after),
+        args.ai_after,
+    )
+    try:
+        launcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+On-demand profiling of a running process.
+
+A capture runs for a window of N seconds and writes three files named
+after the process and the start time into the profile directory:
+
+    NAME-YYYYmmdd-HHMMSS.prof    cProfile stats of the instrumented threads
+                                 (load with pstats or snakeviz)
+    NAME-YYYYmmdd-HHMMSS.txt     the 40 most expensive functions and the
+                                 25 lines that allocated the most memory
+                                 during the window (tracemalloc)
+    NAME-YYYYmmdd-HHMMSS.stacks  stack samples of every thread in collapsed
+                                 format ("thread;outer;...;inner count"),
+                                 ready for flamegraph.pl or speedscope
+
+Captures are started with SIGUSR1 (`install_signal`) or by calling
+`start()`, e.g. from a key binding in the game client:
+
+    kill -USR1 <server pid>
+
+Before Python 3.12 cProfile only sees the thread that enabled it, so
+long-running loops call `checkpoint()` once per iteration: while a
+capture is running it enables a profiler for the calling thread, and
+once the window is over it hands the thread's stats to the capture.
+Outside a capture a checkpoint is one global comparison. Threads that do
+not reach a checkpoint before the results are written (blocked in recv
+for the whole window) only appear in the stack samples.
+
+From 3.12 cProfile sits on sys.monitoring, which sees every thread but
+allows only one active profiler per interpreter. The capture then enables
+a single profiler for the whole window and checkpoints do nothing.
+"""
+
+import cProfile
+import collections
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+import log
+
+logger = log.get_logger("profiling")
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.01
+
+# Seconds to wait after the window for threads to hand in their stats
+COLLECT_GRACE = 1.0
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# One profiler for every thread (sys.monitoring) instead of one per thread
+PROCESS_WIDE = sys.version_info >= (3, 12)
+
+# Settings (see configure)
+_directory = "."
+_seconds = 10.0
+_name = "battleship"
+
+# The running Capture, and how many thread profilers are still enabled
+_capture = None
+_open = 0
+# Reentrant: the SIGUSR1 handler may run while the main thread holds it
+_lock = threading.RLock()
+_local = threading.local()
+
+
+def configure(name: str = None, directory: str = None, seconds: float = None) -> None:
+    """
+    Set the file name prefix, the output directory and the default
+    capture length.
+    """
+    global _name, _directory, _seconds
+    if name is not None:
+        _name = name
+    if directory is not None:
+        _directory = directory
+    if seconds is not None:
+        _seconds = seconds
+
+
+def add_arguments(parser) -> None:
+    """
+    Add the profiling options to a command line parser.
+    """
+    parser.add_argument("--profile-dir", metavar="PATH", default=".", help="where SIGUSR1 profiles are written")
+    parser.add_argument("--profile-seconds", type=float, default=10.0, metavar="N", help="length of a profile capture")
+
+
+def configure_from_args(args, name: str) -> None:
+    configure(name, args.profile_dir, args.profile_seconds)
+
+
+def install_signal() -> None:
+    """
+    Start a capture on SIGUSR1. Call from the main thread; does nothing
+    where the signal does not exist (Windows).
+    """
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: start())
+
+
+def start(seconds: float = None) -> bool:
+    """
+    Begin a capture of `seconds` (default: the configured length).
+    Returns False if one is already running.
+    """
+    global _capture
+    with _lock:
+        if _capture is not None:
+            return False
+        capture = _capture = Capture(seconds or _seconds)
+    threading.Thread(target=capture.run, name="profiler", daemon=True).start()
+    return True
+
+
+def running() -> bool:
+    return _capture is not None
+
+
+def checkpoint() -> None:
+    """
+    Enable or finish the calling thread's profiler; call once per loop
+    iteration in threads that should show up in the cProfile stats.
+    """
+    if PROCESS_WIDE or (_capture is None and not _open):
+        return
+    try:
+        _switch()
+    except Exception as exc:
+        # Never fail the caller's loop; this thread sits out the capture
+        _local.failed = _capture
+        logger.warning("profile_checkpoint_failed", thread=threading.current_thread().name, error=exc)
+
+
+def _switch() -> None:
+    global _open
+    capture = _capture
+    current = getattr(_local, "profile", None)
+    if current is not None:
+        owner, profile = current
+        if owner is capture:
+            return
+        _local.profile = None
+        with _lock:
+            _open -= 1
+        profile.disable()
+        owner.add(profile)
+    if capture is not None and not capture.closing and getattr(_local, "failed", None) is not capture:
+        profile = cProfile.Profile()
+        profile.enable()
+        _local.profile = (capture, profile)
+        with _lock:
+            _open += 1
+
+
+class Capture:
+    """
+    One profiling window.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.closing = False
+        self.profiles = []
+        self.samples = collections.Counter()
+        self.started = time.time()
+
+    def add(self, profile: cProfile.Profile) -> None:
+        with _lock:
+            if not self.closing:
+                self.profiles.append(profile)
+
+    def run(self) -> None:
+        global _capture
+        stem = os.path.join(_directory, f"{_name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}")
+        logger.info("profile_started", seconds=self.seconds, path=stem)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+
+        profile = None
+        try:
+            if PROCESS_WIDE:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError as exc:
+                    # Another profiler or debugger holds sys.monitoring
+                    logger.warning("profile_unavailable", error=exc)
+                    profile = None
+
+            deadline = time.monotonic() + self.seconds
+            while time.monotonic() < deadline:
+                self.sample()
+                time.sleep(SAMPLE_INTERVAL)
+
+            if profile is not None:
+                profile.disable()
+                self.add(profile)
+                profile = None
+
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            # Threads see the window closed at their next checkpoint
+            _capture = None
+            time.sleep(COLLECT_GRACE)
+            with _lock:
+                self.closing = True
+                profiles = list(self.profiles)
+
+            self.write(stem, profiles, before, after, current, peak)
+            logger.info("profile_written", path=stem, threads=len(profiles), samples=sum(self.samples.values()))
+        except Exception:
+            logger.exception("profile_failed", path=stem)
+        finally:
+            if profile is not None:
+                profile.disable()
+            self.closing = True
+            if _capture is self:
+                _capture = None
+
+    def sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, stem: str, profiles: list, before, after, current: int, peak: int) -> None:
+        os.makedirs(_directory, exist_ok=True)
+        report = io.StringIO()
+
+        if profiles:
+            stats = pstats.Stats(*profiles, stream=report)
+            stats.dump_stats(stem + ".prof")
+            threads = "all threads" if PROCESS_WIDE else f"{len(profiles)} threads"
+            report.write(f"cProfile: {threads} over {self.seconds:g} s\n")
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        else:
+            report.write("cProfile: no thread reached a checkpoint during the window\n\n")
+
+        report.write(f"tracemalloc: {current / 1024:.0f} KiB traced at the end, peak {peak / 1024:.0f} KiB\n")
+        report.write(f"Top {TOP_ALLOCATIONS} allocation sites during the window:\n")
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+        growth = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        for stat in growth[:TOP_ALLOCATIONS]:
+            report.write(f"  {stat}\n")
+
+        with open(stem + ".txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        with open(stem + ".stacks", "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
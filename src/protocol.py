@@ -0,0 +1,390 @@
+"""
+Wire protocol shared by the server and the clients.
+
+Every message is sent as one frame:
+
+    +----------------------+------------------------+
+    | length (4 bytes, BE) | body                   |
+    +----------------------+------------------------+
+
+The body is either a UTF-8 JSON object (protocol version 1, always
+available and easy to debug) or a compact binary record (version 2):
+a one-byte message type followed by struct-packed fields, with board
+cells as single byte indexes and sunk ships as a 100-bit mask. JSON
+bodies always start with "{" and binary type codes are below it, so
+the decoder recognises each frame on its own.
+
+The version is negotiated in the handshake: the client names the highest
+version it wants in "join", the server answers with "welcome" and both
+sides switch encoders from there on. Messages without a binary layout
+are sent as JSON under either version.
+
+TCP is a byte stream, so a single recv may return half a frame or several
+frames at once. FrameDecoder buffers the stream and hands out complete
+messages only.
+"""
+
+import json
+import struct
+
+from fleet import CELLS, COORD_CELLS, COORDS, cells_mask, coord_to_cell, mask_cells
+
+HEADER = struct.Struct("!I")
+
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+PROTOCOL_VERSIONS = (PROTOCOL_JSON, PROTOCOL_BINARY)
+
+# Upper bound for a single frame; anything larger is treated as garbage
+MAX_FRAME = 64 * 1024
+
+
+class ProtocolError(ValueError):
+    """
+    Raised when the peer sends bytes that are not a valid frame.
+    """
+
+
+# -------------------------------------------------
+# Binary encoding (protocol version 2)
+# -------------------------------------------------
+MSG_PLACE = 1
+MSG_READY = 2
+MSG_MOVE = 3
+MSG_START_GAMEPLAY = 4
+MSG_TURN = 5
+MSG_RESULT = 6
+MSG_OPPONENT_MOVE = 7
+MSG_GAMEOVER = 8
+MSG_ERROR = 9
+MSG_WELCOME = 10
+MSG_SPECTATE_MOVE = 11
+MSG_PING = 12
+MSG_PONG = 13
+MSG_STATE = 14
+
+STATUSES = ("miss", "hit", "sink")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+MASK_BYTES = (CELLS + 7) // 8
+
+_TYPE_ONLY = struct.Struct("!B")
+_STATUS_CELL = struct.Struct("!BBB")
+_WELCOME = struct.Struct("!BBIB")
+_START_GAMEPLAY = struct.Struct("!BIB")
+_SPECTATE_MOVE = struct.Struct("!BBBB")
+_TOKEN = struct.Struct("!Q")
+_STATE = struct.Struct("!BIBBB")
+
+TURN_MESSAGE = "Your turn!"
+
+
+def _pack_text(msg_code: int, text: str) -> bytes:
+    return _TYPE_ONLY.pack(msg_code) + text.encode()
+
+
+def _coord(cell: int) -> str:
+    if cell >= CELLS:
+        raise ProtocolError(f"Cell index {cell} is outside the board.")
+    return COORDS[cell]
+
+
+def _encode_place(payload: dict) -> bytes:
+    ships = payload["ships"]
+    cells = [MSG_PLACE, len(ships)]
+    for ship in ships:
+        cells.append(coord_to_cell(ship["start"]))
+        cells.append(coord_to_cell(ship["end"]))
+    return bytes(cells)
+
+
+def _decode_place(body: bytes) -> dict:
+    count = body[1]
+    if len(body) != 2 + 2 * count:
+        raise ProtocolError("Truncated place message.")
+    ships = [
+        {"start": _coord(body[i]), "end": _coord(body[i + 1])}
+        for i in range(2, 2 + 2 * count, 2)
+    ]
+    return {"type": "place", "ships": ships}
+
+
+def _encode_result(payload: dict) -> bytes:
+    status = STATUS_CODES[payload["status"]]
+    body = _STATUS_CELL.pack(MSG_RESULT, status, COORD_CELLS[payload["coord"]])
+    if status == STATUS_CODES["sink"]:
+        mask = cells_mask(COORD_CELLS[c] for c in payload["sunk_coords"])
+        body += mask.to_bytes(MASK_BYTES, "big")
+    return body
+
+
+def _decode_result(body: bytes) -> dict:
+    _, status, cell = _STATUS_CELL.unpack_from(body)
+    message = {"type": "result", "status": STATUSES[status], "coord": _coord(cell)}
+    if status == STATUS_CODES["sink"]:
+        mask = int.from_bytes(body[_STATUS_CELL.size:_STATUS_CELL.size + MASK_BYTES], "big")
+        message["sunk_coords"] = [COORDS[c] for c in mask_cells(mask)]
+    return message
+
+
+def _encode_opponent_move(payload: dict) -> bytes:
+    return _STATUS_CELL.pack(
+        MSG_OPPONENT_MOVE, STATUS_CODES[payload["status"]], COORD_CELLS[payload["coord"]]
+    )
+
+
+def _decode_opponent_move(body: bytes) -> dict:
+    _, status, cell = _STATUS_CELL.unpack_from(body)
+    return {"type": "opponent_move", "coord": _coord(cell), "status": STATUSES[status]}
+
+
+def _encode_welcome(payload: dict) -> bytes:
+    body = _WELCOME.pack(MSG_WELCOME, payload["protocol"], payload["match"], payload["seat"])
+    if payload.get("token") is not None:
+        body += _TOKEN.pack(payload["token"])
+    return body
+
+
+def _decode_welcome(body: bytes) -> dict:
+    _, version, match_id, seat = _WELCOME.unpack_from(body)
+    message = {"type": "welcome", "protocol": version, "match": match_id, "seat": seat}
+    if len(body) >= _WELCOME.size + _TOKEN.size:
+        (message["token"],) = _TOKEN.unpack_from(body, _WELCOME.size)
+    return message
+
+
+def _mask_of(coords) -> bytes:
+    return cells_mask(COORD_CELLS[c] for c in coords).to_bytes(MASK_BYTES, "big")
+
+
+def _encode_state(payload: dict) -> bytes:
+    """
+    Header, the first and last cell of every ship, then five board masks:
+    cells you shot at, hits among them, cells of ships you sank, cells the
+    opponent shot at and their hits.
+    """
+    ships = payload["ships"]
+    body = bytearray(_STATE.pack(MSG_STATE, payload["match"], payload["seat"], payload["your_turn"], len(ships)))
+    for ship in ships:
+        body += bytes((COORD_CELLS[ship["start"]], COORD_CELLS[ship["end"]]))
+
+    yours = payload["your_moves"]
+    enemy = payload["enemy_moves"]
+    body += _mask_of(yours)
+    body += _mask_of(c for c, status in yours.items() if status != "miss")
+    body += _mask_of(c for c, status in yours.items() if status == "sink")
+    body += _mask_of(c for c, _ in enemy)
+    body += _mask_of(c for c, status in enemy if status != "miss")
+    return bytes(body)
+
+
+def _decode_state(body: bytes) -> dict:
+    _, match_id, seat, your_turn, count = _STATE.unpack_from(body)
+    pos = _STATE.size
+    ships = [{"start": _coord(body[i]), "end": _coord(body[i + 1])} for i in range(pos, pos + 2 * count, 2)]
+    pos += 2 * count
+
+    masks = []
+    for _ in range(5):
+        if len(body) < pos + MASK_BYTES:
+            raise ProtocolError("Truncated state message.")
+        masks.append(int.from_bytes(body[pos:pos + MASK_BYTES], "big"))
+        pos += MASK_BYTES
+    shots, hits, sunk, enemy_shots, enemy_hits = masks
+
+    your_moves = {}
+    for cell in mask_cells(shots):
+        bit = 1 << cell
+        your_moves[COORDS[cell]] = "sink" if sunk & bit else "hit" if hits & bit else "miss"
+    enemy_moves = [
+        [COORDS[cell], "hit" if enemy_hits >> cell & 1 else "miss"] for cell in mask_cells(enemy_shots)
+    ]
+    return {
+        "type": "state",
+        "match": match_id,
+        "seat": seat,
+        "your_turn": bool(your_turn),
+        "ships": ships,
+        "your_moves": your_moves,
+        "enemy_moves": enemy_moves,
+    }
+
+
+def _encode_start_gameplay(payload: dict) -> bytes:
+    if "match" not in payload:
+        return _TYPE_ONLY.pack(MSG_START_GAMEPLAY)
+    return _START_GAMEPLAY.pack(MSG_START_GAMEPLAY, payload["match"], payload["seat"])
+
+
+def _decode_start_gameplay(body: bytes) -> dict:
+    if len(body) < _START_GAMEPLAY.size:
+        return {"type": "start_gameplay"}
+    _, match_id, seat = _START_GAMEPLAY.unpack_from(body)
+    return {"type": "start_gameplay", "match": match_id, "seat": seat}
+
+
+def _encode_spectate_move(payload: dict) -> bytes:
+    status = STATUS_CODES[payload["status"]]
+    body = _SPECTATE_MOVE.pack(MSG_SPECTATE_MOVE, payload["seat"], status, COORD_CELLS[payload["coord"]])
+    if status == STATUS_CODES["sink"]:
+        mask = cells_mask(COORD_CELLS[c] for c in payload["sunk_coords"])
+        body += mask.to_bytes(MASK_BYTES, "big")
+    return body
+
+
+def _decode_spectate_move(body: bytes) -> dict:
+    _, seat, status, cell = _SPECTATE_MOVE.unpack_from(body)
+    message = {"type": "spectate_move", "seat": seat, "status": STATUSES[status], "coord": _coord(cell)}
+    if status == STATUS_CODES["sink"]:
+        mask = int.from_bytes(body[_SPECTATE_MOVE.size:_SPECTATE_MOVE.size + MASK_BYTES], "big")
+        message["sunk_coords"] = [COORDS[c] for c in mask_cells(mask)]
+    return message
+
+
+def _encode_ready(payload: dict):
+    # "ready" with options (opponent, difficulty, skill) is sent as JSON
+    if len(payload) > 1:
+        return None
+    return _TYPE_ONLY.pack(MSG_READY)
+
+
+# message type -> function(payload) -> binary body, or None to send JSON
+BINARY_ENCODERS = {
+    "place": _encode_place,
+    "ready": _encode_ready,
+    "move": lambda payload: bytes((MSG_MOVE, coord_to_cell(payload["coord"]))),
+    "start_gameplay": _encode_start_gameplay,
+    "turn": lambda payload: _TYPE_ONLY.pack(MSG_TURN),
+    "result": _encode_result,
+    "opponent_move": _encode_opponent_move,
+    "gameover": lambda payload: _pack_text(MSG_GAMEOVER, payload["winner"]),
+    "error": lambda payload: _pack_text(MSG_ERROR, payload["message"]),
+    "welcome": _encode_welcome,
+    "spectate_move": _encode_spectate_move,
+    "ping": lambda payload: _TYPE_ONLY.pack(MSG_PING),
+    "pong": lambda payload: _TYPE_ONLY.pack(MSG_PONG),
+    "state": _encode_state,
+}
+
+# binary type code -> function(body) -> message dict
+BINARY_DECODERS = {
+    MSG_PLACE: _decode_place,
+    MSG_READY: lambda body: {"type": "ready"},
+    MSG_MOVE: lambda body: {"type": "move", "coord": _coord(body[1])},
+    MSG_START_GAMEPLAY: _decode_start_gameplay,
+    MSG_TURN: lambda body: {"type": "turn", "message": TURN_MESSAGE},
+    MSG_RESULT: _decode_result,
+    MSG_OPPONENT_MOVE: _decode_opponent_move,
+    MSG_GAMEOVER: lambda body: {"type": "gameover", "winner": body[1:].decode()},
+    MSG_ERROR: lambda body: {"type": "error", "message": body[1:].decode()},
+    MSG_WELCOME: _decode_welcome,
+    MSG_SPECTATE_MOVE: _decode_spectate_move,
+    MSG_PING: lambda body: {"type": "ping"},
+    MSG_PONG: lambda body: {"type": "pong"},
+    MSG_STATE: _decode_state,
+}
+
+
+# -------------------------------------------------
+# Frames
+# -------------------------------------------------
+def negotiate(requested) -> int:
+    """
+    Pick the protocol version to use for a client that asked for `requested`.
+    """
+    if requested in PROTOCOL_VERSIONS:
+        return requested
+    return PROTOCOL_JSON
+
+
+def encode_body(payload: dict, version: int = PROTOCOL_JSON) -> bytes:
+    if version == PROTOCOL_BINARY:
+        encoder = BINARY_ENCODERS.get(payload.get("type"))
+        body = encoder(payload) if encoder is not None else None
+        if body is not None:
+            return body
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def encode(payload: dict, version: int = PROTOCOL_JSON) -> bytes:
+    """
+    Encode a message into a complete frame ready to be written to a socket.
+    """
+    body = encode_body(payload, version)
+    return HEADER.pack(len(body)) + body
+
+
+def decode_body(body: bytes) -> dict:
+    """
+    Decode the body of a single frame, JSON or binary.
+    """
+    if body[:1] == b"{":
+        try:
+            message = json.loads(body)
+        except ValueError as exc:
+            raise ProtocolError(f"Invalid message body: {exc}") from None
+        if not isinstance(message, dict):
+            raise ProtocolError("Message body must be a JSON object.")
+        return message
+
+    decoder = BINARY_DECODERS.get(body[0]) if body else None
+    if decoder is None:
+        raise ProtocolError(f"Unknown binary message type: {body[:1]!r}")
+    try:
+        return decoder(body)
+    except (struct.error, IndexError, ValueError) as exc:
+        raise ProtocolError(f"Invalid binary message: {exc}") from None
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a stream of frames.
+
+    Feed it whatever recv returned; it returns the messages completed by
+    those bytes and keeps any partial trailing frame for the next call.
+    Consumed bytes are dropped from the front of the buffer, which CPython
+    does in place without copying, so decoding stays linear in the
+    number of bytes received.
+    """
+
+    def __init__(self, max_frame: int = MAX_FRAME):
+        self.max_frame = max_frame
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        buffer = self._buffer
+        buffer += data
+
+        messages = []
+        pos = 0
+        end = len(buffer)
+        while end - pos >= HEADER.size:
+            (length,) = HEADER.unpack_from(buffer, pos)
+            if length > self.max_frame:
+                raise ProtocolError(f"Frame of {length} bytes exceeds limit of {self.max_frame}.")
+
+            start = pos + HEADER.size
+            if end - start < length:
+                break
+
+            messages.append(decode_body(bytes(buffer[start:start + length])))
+            pos = start + length
+
+        if pos:
+            del buffer[:pos]
+        return messages
+
+    def pending(self) -> int:
+        """
+        Number of buffered bytes that do not form a complete frame yet.
+        """
+        return len(self._buffer)
+
+    def take_pending(self) -> bytes:
+        """
+        Remove and return the buffered bytes of an incomplete frame, e.g.
+        to carry them along when a connection moves to another process.
+        """
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
@@ -0,0 +1,123 @@
+"""
+Caches of the game client's fonts, rendered text and transformed images.
+
+Looking up a system font, rendering a string and scaling or rotating a
+sprite all allocate a new surface. The screens draw the same strings and
+sprites every frame, so each of these is done once and the result is
+kept in a bounded LRU cache:
+
+    font(name, size, bold)                  pygame.font.Font
+    text(string, name, size, color, bold)   rendered text surface
+    image(path, alpha)                      loaded and converted image
+    transformed(image, size, orientation)   scaled (and rotated) copy
+
+Callers must not draw on the surfaces they get back; they are shared.
+`stats()` reports hits and misses per cache.
+"""
+
+import collections
+
+import pygame
+
+# Entries kept per cache before the least recently used is dropped
+FONT_CAPACITY = 32
+TEXT_CAPACITY = 256
+IMAGE_CAPACITY = 16
+TRANSFORM_CAPACITY = 64
+
+
+class LRUCache:
+    """
+    Mapping of at most `capacity` entries, created on first use.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, create):
+        """
+        Return the entry for `key`, calling `create()` to make it if absent.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self._entries[key] = create()
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            return value
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_fonts = LRUCache(FONT_CAPACITY)
+_texts = LRUCache(TEXT_CAPACITY)
+_images = LRUCache(IMAGE_CAPACITY)
+_transforms = LRUCache(TRANSFORM_CAPACITY)
+
+
+def font(name, size: int, bold: bool = False) -> pygame.font.Font:
+    """
+    pygame.font.SysFont(name, size, bold), looked up once.
+    """
+    return _fonts.get((name, size, bold), lambda: pygame.font.SysFont(name, size, bold=bold))
+
+
+def text(string: str, name, size: int, color, bold: bool = False) -> pygame.Surface:
+    """
+    Antialiased `string` rendered in `color` with the given system font.
+    """
+    key = (name, size, bold, string, tuple(color))
+    return _texts.get(key, lambda: font(name, size, bold).render(string, True, color))
+
+
+def image(path: str, alpha: bool = False) -> pygame.Surface:
+    """
+    Load an image and convert it to the display format (keeping
+    transparency with `alpha`). Needs the display mode to be set.
+    """
+
+    def load():
+        loaded = pygame.image.load(path)
+        return loaded.convert_alpha() if alpha else loaded.convert()
+
+    return _images.get((path, alpha), load)
+
+
+def transformed(source: pygame.Surface, size, orientation: str = "horizontal") -> pygame.Surface:
+    """
+    `source` scaled to `size`; a "vertical" one is rotated by 90 degrees
+    first.
+    """
+
+    def transform():
+        rotated = pygame.transform.rotate(source, 90) if orientation == "vertical" else source
+        return pygame.transform.scale(rotated, size)
+
+    return _transforms.get((source, tuple(size), orientation), transform)
+
+
+def clear() -> None:
+    """
+    Drop every cached entry, e.g. after the display mode changed.
+    """
+    for cache in (_fonts, _texts, _images, _transforms):
+        cache.clear()
+
+
+def stats() -> dict:
+    """
+    {cache name: (entries, hits, misses)}
+    """
+    caches = {"fonts": _fonts, "texts": _texts, "images": _images, "transforms": _transforms}
+    return {name: (len(cache), cache.hits, cache.misses) for name, cache in caches.items()}
@@ -1,267 +1,337 @@
+import argparse
+import os
 import socket
+import struct
+import sys
 import threading
-import json
+import time
+
+import handlers
+import log
+import metrics
+import profiling
+import snapshot
+from handlers import Connection, handle_connect, handle_disconnect, handle_message
+from journal import JournalReader, MatchJournal
+from matchmaking import SWEEP_INTERVAL, MatchmakingQueue
+from protocol import FrameDecoder
+from snapshot import SNAPSHOT_INTERVAL
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # Windows
+    fcntl = termios = None
+
+logger = log.get_logger("server")
 
 HOST = "localhost"
 PORT = 5001
 
-# player_socket -> "Player1" / "Player2" / custom name
-players = {}
+# Bytes a connection may have in the kernel send queue, not yet
+# acknowledged by the peer, before the peer is considered stalled
+HIGH_WATER = 256 * 1024
 
-# player_socket -> list of ships
-# ship structure: {"positions": [(row, col), ...], "hits": [(row, col), ...], "sunk": bool}
-player_ships = {}
+# ioctl reading the size of a socket's send queue (Linux only; elsewhere
+# only the write timeout catches a stalled peer)
+SIOCOUTQ = termios.TIOCOUTQ if termios is not None and sys.platform.startswith("linux") else None
 
-# players that sent "ready"
-ready_players = set()
+# Seconds a blocked write may wait for the peer to read
+WRITE_TIMEOUT = 10.0
 
-# socket of the player whose turn it is
-current_turn = None
+# Seconds try_send_frame waits for another thread's write to finish; a
+# write still going after that is blocked on a peer that stopped reading
+LOCK_WAIT = 0.1
 
+# Send flag for a write that must not block (Windows has none; there the
+# write timeout bounds it)
+NO_WAIT = getattr(socket, "MSG_DONTWAIT", 0)
 
-# -------------------------------------------------
-# Helper functions
-# -------------------------------------------------
-def coord_to_index(coord: str) -> tuple[int, int]:
+
+def set_write_timeout(sock: socket.socket, seconds: float) -> None:
     """
-    Convert a board coordinate like 'A5' into (row, col) indices.
-    Rows and columns are 0-based.
+    Make blocking sends fail after `seconds` without affecting recv.
     """
-    col = ord(coord[0].upper()) - ord("A")
-    row = int(coord[1:]) - 1
-    return row, col
+    if sys.platform == "win32":
+        value = struct.pack("L", int(seconds * 1000))
+    else:
+        value = struct.pack("ll", int(seconds), int(seconds % 1 * 1_000_000))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, value)
 
 
-def send_message(client_socket: socket.socket, payload: dict) -> None:
+def send_queue(sock: socket.socket) -> int:
     """
-    Safely send a JSON-encoded message to a client.
+    Bytes written to `sock` that the peer has not acknowledged yet (0
+    where this is unknown).
     """
+    if SIOCOUTQ is None:
+        return 0
     try:
-        data = json.dumps(payload).encode()
-        client_socket.send(data)
-    except Exception as exc:
-        print(f"❌ Failed to send message to {players.get(client_socket, 'Unknown')}: {exc}")
+        return struct.unpack("i", fcntl.ioctl(sock.fileno(), SIOCOUTQ, b"\0\0\0\0"))[0]
+    except OSError:
+        return 0
+
+
+class SocketConnection(Connection):
+    """
+    Connection served by a dedicated thread with a blocking socket.
+
+    Any thread may write to it (the mover's thread sends the opponent's
+    "turn"); a lock keeps frames from interleaving. A writer that finds
+    more than HIGH_WATER bytes in the kernel send queue, or whose send
+    fails (e.g. after WRITE_TIMEOUT), closes the connection: the peer
+    stopped reading, and a frame cut short must not be followed by
+    another.
+    """
+
+    def __init__(self, client_socket: socket.socket, addr):
+        super().__init__(addr)
+        self.socket = client_socket
+        self._write_lock = threading.Lock()
+
+    def write(self, data: bytes) -> None:
+        with self._write_lock:
+            queued = send_queue(self.socket)
+            if queued > HIGH_WATER:
+                logger.warning("client_stalled", addr=self.addr, queued=queued)
+                self.close()
+                raise ConnectionError("Peer is not reading.")
+            try:
+                self.socket.sendall(data)
+            except OSError:
+                # Part of the frame may have been sent
+                self.close()
+                raise
+        handlers.metrics.bytes_out += len(data)
+
+    def try_send_frame(self, data: bytes) -> bool:
+        if not self._write_lock.acquire(timeout=LOCK_WAIT):
+            return False
+        try:
+            sent = self.socket.send(data, NO_WAIT)
+        except BlockingIOError:
+            return False
+        finally:
+            self._write_lock.release()
+        handlers.metrics.bytes_out += sent
+        if sent < len(data):
+            # The rest of the frame cannot follow later
+            self.close()
+            return False
+        return True
+
+    def close(self) -> None:
+        # Wakes the connection's thread if another thread closes it
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
 
 
 # -------------------------------------------------
 # Per-client handler
 # -------------------------------------------------
 def handle_client(client_socket: socket.socket, addr) -> None:
-    global current_turn
-
-    print(f"🔌 Client connected: {addr}")
+    conn = SocketConnection(client_socket, addr)
+    decoder = FrameDecoder()
+    logger.info("client_connected", addr=addr)
+    metrics = handlers.metrics
+    metrics.connections += 1
+    handle_connect(conn)
 
     while True:
         try:
-            data = client_socket.recv(2048).decode()
+            data = client_socket.recv(4096)
 
             # Connection closed
             if not data:
-                print(f"📴 Connection closed: {addr}")
+                logger.info("client_disconnected", addr=addr)
                 break
+            metrics.bytes_in += len(data)
+            conn.last_seen = time.monotonic()
+            profiling.checkpoint()
 
-            message = json.loads(data)
-            player_name = players.get(client_socket, str(addr))
-            print(f"📨 Message from {player_name}: {message}")
-
-            msg_type = message.get("type")
-
-            # -----------------------------
-            # Player joins the game
-            # -----------------------------
-            if msg_type == "join":
-                name = message.get("name", f"Player{len(players) + 1}")
-                players[client_socket] = name
-                print(f"👤 Player joined: {name}")
-                continue
-
-            # -----------------------------
-            # Player places ships
-            # -----------------------------
-            if msg_type == "place":
-                ships_payload = message.get("ships", [])
-                ships = []
-
-                for ship in ships_payload:
-                    start_row, start_col = coord_to_index(ship["start"])
-                    end_row, end_col = coord_to_index(ship["end"])
-                    positions = []
-
-                    # Horizontal ship
-                    if start_row == end_row:
-                        for col in range(min(start_col, end_col), max(start_col, end_col) + 1):
-                            positions.append((start_row, col))
-
-                    # Vertical ship
-                    elif start_col == end_col:
-                        for row in range(min(start_row, end_row), max(start_row, end_row) + 1):
-                            positions.append((row, start_col))
-
-                    ships.append(
-                        {
-                            "positions": positions,
-                            "hits": [],
-                            "sunk": False,
-                        }
-                    )
-
-                player_ships[client_socket] = ships
-                print(f"🚢 {player_name} placed ships.")
-                continue
-
-            # -----------------------------
-            # Player is ready to start
-            # -----------------------------
-            if msg_type == "ready":
-                ready_players.add(player_name)
-                print(f"✅ {player_name} is ready. Total ready: {len(ready_players)}")
-
-                # When two players are ready, start the game
-                if len(ready_players) == 2:
-                    print("🎮 Both players are ready. Starting game...")
-
-                    # Sort players by name ("Player1" → "Player2")
-                    player_list = sorted(players.items(), key=lambda x: x[1])
-                    player_sockets = [p[0] for p in player_list]
-
-                    # Notify clients that gameplay can start
-                    for c in player_sockets:
-                        print(f"📤 Sending 'start_gameplay' to {players[c]}")
-                        send_message(c, {"type": "start_gameplay"})
-
-                    # Give the first turn to the first player
-                    current_turn = player_sockets[0]
-                    send_message(
-                        current_turn,
-                        {"type": "turn", "message": "Your turn!"},
-                    )
-
-                continue
-
-            # -----------------------------
-            # Player makes a move (fires at coord)
-            # -----------------------------
-            if msg_type == "move":
-                # Always sort players to keep a stable order (Player1, Player2)
-                player_list = sorted(players.items(), key=lambda x: x[1])
-                player_sockets = [p[0] for p in player_list]
-
-                # Not this player's turn
-                if client_socket != current_turn:
-                    error_payload = {"type": "error", "message": "It is not your turn."}
-                    send_message(client_socket, error_payload)
-                    continue
-
-                coord = message["coord"]
-                target_row, target_col = coord_to_index(coord)
-
-                # Determine opponent
-                if len(player_sockets) < 2:
-                    # Not enough players yet
-                    send_message(
-                        client_socket,
-                        {"type": "error", "message": "Opponent is not connected yet."},
-                    )
-                    continue
-
-                opponent = player_sockets[0] if client_socket == player_sockets[1] else player_sockets[1]
-
-                hit = False
-                sunk = False
-                sunk_ship = None
-
-                # Check hit / miss
-                for ship in player_ships.get(opponent, []):
-                    if (target_row, target_col) in ship["positions"]:
-                        if (target_row, target_col) not in ship["hits"]:
-                            ship["hits"].append((target_row, target_col))
-                        hit = True
-
-                        # Check if this ship is sunk
-                        if set(ship["hits"]) == set(ship["positions"]):
-                            ship["sunk"] = True
-                            sunk = True
-                            sunk_ship = ship
-                        break
-
-                # Build response for the current player
-                if sunk and sunk_ship is not None:
-                    response = {
-                        "type": "result",
-                        "status": "sink",
-                        "coord": coord,
-                        "sunk_coords": [
-                            chr(ord("A") + col) + str(row + 1)
-                            for (row, col) in sunk_ship["positions"]
-                        ],
-                    }
-                else:
-                    response = {
-                        "type": "result",
-                        "status": "hit" if hit else "miss",
-                        "coord": coord,
-                    }
-
-                send_message(client_socket, response)
-
-                # Notify opponent about the move
-                opponent_notify = {
-                    "type": "opponent_move",
-                    "coord": coord,
-                    "status": "hit" if hit else "miss",
-                }
-                send_message(opponent, opponent_notify)
-
-                # Check if the opponent has any ships left
-                all_sunk = all(ship["sunk"] for ship in player_ships.get(opponent, []))
-                if all_sunk:
-                    gameover_payload = {
-                        "type": "gameover",
-                        "winner": players.get(client_socket, "Unknown"),
-                    }
-                    for c in player_sockets:
-                        send_message(c, gameover_payload)
-                else:
-                    # Switch turn
-                    current_turn = opponent
-                    print(f"🔄 Turn changed → now: {players[current_turn]}")
-                    send_message(
-                        current_turn,
-                        {"type": "turn", "message": "Your turn!"},
-                    )
-
-                continue
+            for message in decoder.feed(data):
+                handle_message(conn, message)
 
         except Exception as e:
-            print(f"❌ Error while handling client {addr}: {e}")
+            logger.warning("client_error", addr=addr, error=e)
             break
 
     # Cleanup after disconnect
-    if client_socket in players:
-        print(f"🧹 Cleaning up player: {players[client_socket]}")
-        del players[client_socket]
+    metrics.connections -= 1
+    handle_disconnect(conn)
+    conn.close()
 
-    if client_socket in player_ships:
-        del player_ships[client_socket]
 
-    client_socket.close()
+def matchmaking_loop() -> None:
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        handlers.run_matchmaking()
 
 
-def main() -> None:
+def reaper_loop() -> None:
+    while True:
+        time.sleep(handlers.REAP_INTERVAL)
+        try:
+            handlers.reap()
+        except Exception:
+            logger.exception("reaper_failed")
+
+
+def serve_threads(host: str, port: int) -> None:
     """
-    Entry point: creates the server socket and accepts incoming clients.
+    Thread-per-connection engine: every accepted socket gets its own
+    daemon thread blocking in recv.
     """
+    threading.Thread(target=matchmaking_loop, daemon=True).start()
+    threading.Thread(target=reaper_loop, name="reaper", daemon=True).start()
+
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.bind((HOST, PORT))
+    # Rebind straight away after a restart (asyncio does the same)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
     server_socket.listen()
 
-    print(f"🌊 Battleship server listening on {HOST}:{PORT} ...")
+    logger.info("listening", host=host, port=port, engine="threads")
 
     while True:
         client_socket, addr = server_socket.accept()
+        # Replies are complete messages; do not hold them back for more data
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        set_write_timeout(client_socket, WRITE_TIMEOUT)
         thread = threading.Thread(target=handle_client, args=(client_socket, addr), daemon=True)
         thread.start()
 
 
+def open_journal(path: str) -> None:
+    """
+    Start journaling match events to `path`. Match ids continue after
+    the highest id already in the file, so replays stay unambiguous.
+    """
+    if os.path.exists(path):
+        reader = JournalReader(path)
+        ids = reader.match_ids()
+        reader.close()
+        if ids:
+            handlers.registry.advance_ids(ids[-1])
+    handlers.journal = MatchJournal(path)
+
+
+def main() -> None:
+    """
+    Entry point: parses the command line and starts the selected engine.
+    """
+    parser = argparse.ArgumentParser(description="Battleship game server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "asyncio"),
+        default="threads",
+        help="thread-per-connection (default) or a single asyncio event loop",
+    )
+    parser.add_argument(
+        "--skill-bucket",
+        type=int,
+        default=100,
+        help="rating points per matchmaking bucket (players send 'skill' with 'ready')",
+    )
+    parser.add_argument(
+        "--widen-after",
+        type=float,
+        default=5.0,
+        help="seconds of waiting before a player accepts an opponent one bucket further away "
+        "(0 = pair anyone immediately)",
+    )
+    parser.add_argument(
+        "--ai-after",
+        type=float,
+        default=None,
+        help="seconds a player waits in matchmaking before an AI opponent fills the seat",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=handlers.idle_timeout,
+        help="seconds of silence (heartbeats unanswered) before a connection is closed; 0 = never",
+    )
+    parser.add_argument(
+        "--turn-timeout",
+        type=float,
+        default=handlers.turn_timeout,
+        help="seconds a player may take for a move before losing the match; 0 = no limit",
+    )
+    parser.add_argument(
+        "--resume-grace",
+        type=float,
+        default=handlers.resume_grace,
+        help="seconds a player who dropped out of a running game may take to resume before losing it; "
+        "0 = until the turn timeout",
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="PATH",
+        help="append every match event to this journal file (see journal.py)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="PATH",
+        help="periodically save live matches to this file and resume them on startup",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=SNAPSHOT_INTERVAL,
+        help="seconds between snapshots",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve Prometheus metrics at http://localhost:PORT/metrics",
+    )
+    log.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    log.configure_from_args(args)
+    profiling.configure_from_args(args, "server")
+    profiling.install_signal()
+
+    if args.metrics_port:
+        metrics.serve(handlers.metrics, args.metrics_port)
+        logger.info("metrics_listening", port=args.metrics_port)
+
+    if args.journal:
+        open_journal(args.journal)
+
+    snapshotter = None
+    if args.snapshot:
+        for match in snapshot.load(args.snapshot):
+            handlers.registry.restore(match)
+        logger.info("matches_resumed", count=len(handlers.registry), path=args.snapshot)
+        snapshotter = snapshot.Snapshotter(handlers.registry, args.snapshot, args.snapshot_interval)
+        snapshotter.start()
+
+    handlers.ai_fallback_after = args.ai_after
+    handlers.idle_timeout = args.idle_timeout
+    handlers.turn_timeout = args.turn_timeout
+    handlers.resume_grace = args.resume_grace
+    handlers.matchmaker = MatchmakingQueue(bucket_width=args.skill_bucket, widen_after=args.widen_after)
+
+    try:
+        if args.engine == "asyncio":
+            import aio_server
+
+            aio_server.run(args.host, args.port)
+        else:
+            serve_threads(args.host, args.port)
+    finally:
+        if snapshotter is not None:
+            snapshotter.stop()
+        if handlers.journal is not None:
+            handlers.journal.close()
+
+
 if __name__ == "__main__":
     main()
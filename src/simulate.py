@@ -0,0 +1,219 @@
+"""
+Batch game simulator for tuning AI strategies and fleet rules.
+
+Thousands of boards advance in lockstep as NumPy arrays: every step picks
+one shot per unfinished board and resolves it with the server's rules
+(a shot hits when the cell is occupied, a ship sinks when all of its cells
+are hit, the game ends when every ship is sunk). Fleets are drawn from
+the same placement masks the server expands "place" messages into, and
+the strategies mirror the difficulty levels of the server AI in ai.py.
+
+Batches are spread over a process pool. The report shows the
+shots-to-win distribution and games/sec.
+
+Usage:
+    python simulate.py --strategy hard --games 100000 --workers 8
+    python simulate.py --strategy medium --sizes 2 3 3 4 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from ai import CHECKERBOARD, DIFFICULTIES, TARGET_WEIGHT
+from fleet import CELLS, FLEET_SIZES, GRID_SIZE, PLACEMENTS, mask_cells
+
+
+def placement_matrix(size: int) -> np.ndarray:
+    """
+    Legal placements of a ship as a (placements, CELLS) 0/1 matrix.
+    """
+    matrix = np.zeros((len(PLACEMENTS[size]), CELLS), dtype=np.float32)
+    for index, mask in enumerate(PLACEMENTS[size]):
+        matrix[index, mask_cells(mask)] = 1
+    return matrix
+
+
+CHECKERBOARD_CELLS = np.zeros(CELLS, dtype=bool)
+CHECKERBOARD_CELLS[mask_cells(CHECKERBOARD)] = True
+
+
+def neighbours(cells: np.ndarray) -> np.ndarray:
+    """
+    Cells orthogonally adjacent to any set cell, for a (boards, CELLS) array.
+    """
+    grid = cells.reshape(-1, GRID_SIZE, GRID_SIZE)
+    out = np.zeros_like(grid)
+    out[:, 1:, :] |= grid[:, :-1, :]
+    out[:, :-1, :] |= grid[:, 1:, :]
+    out[:, :, 1:] |= grid[:, :, :-1]
+    out[:, :, :-1] |= grid[:, :, 1:]
+    return out.reshape(-1, CELLS) & ~cells
+
+
+class Batch:
+    """
+    A batch of boards played in lockstep by one shooter each.
+    """
+
+    def __init__(self, boards: int, sizes, rng: np.random.Generator):
+        self.rng = rng
+        self.sizes = np.array(sizes)
+        self.matrices = {size: placement_matrix(size) for size in set(sizes)}
+
+        # ships[b, s, c]: ship s of board b covers cell c
+        self.ships = self._random_fleets(boards, sizes)
+        self.occupied = self.ships.any(axis=1)
+
+        self.shots = np.zeros((boards, CELLS), dtype=bool)
+        self.hits = np.zeros((boards, CELLS), dtype=bool)
+        self.sunk = np.zeros((boards, len(sizes)), dtype=bool)
+        self.shot_count = np.zeros(boards, dtype=np.int32)
+        self.done = np.zeros(boards, dtype=bool)
+
+    def _random_fleets(self, boards: int, sizes) -> np.ndarray:
+        ships = np.zeros((boards, len(sizes), CELLS), dtype=bool)
+        occupied = np.zeros((boards, CELLS), dtype=bool)
+        for s, size in enumerate(sizes):
+            options = self.matrices[size].astype(bool)
+            pending = np.arange(boards)
+            while pending.size:
+                choice = options[self.rng.integers(len(options), size=pending.size)]
+                ok = ~(choice & occupied[pending]).any(axis=1)
+                placed = pending[ok]
+                ships[placed, s] = choice[ok]
+                occupied[placed] |= choice[ok]
+                pending = pending[~ok]
+        return ships
+
+    # -----------------------------
+    # Rules
+    # -----------------------------
+    def fire(self, active: np.ndarray, cells: np.ndarray) -> None:
+        """
+        Resolve one shot per active board.
+        """
+        self.shots[active, cells] = True
+        self.hits[active, cells] = self.occupied[active, cells]
+        self.shot_count[active] += 1
+
+        ship_hits = (self.ships[active] & self.hits[active][:, None, :]).sum(axis=2)
+        self.sunk[active] = ship_hits == self.sizes
+        self.done[active] = self.sunk[active].all(axis=1)
+
+    # -----------------------------
+    # Strategies (see ai.py)
+    # -----------------------------
+    def _pick(self, scores: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+        # Random tie-break below the smallest score step
+        noisy = np.where(allowed, scores + self.rng.random(scores.shape) * 0.5, -1.0)
+        return noisy.argmax(axis=1)
+
+    def shot_easy(self, active: np.ndarray) -> np.ndarray:
+        unexplored = ~self.shots[active]
+        return self._pick(np.zeros(unexplored.shape), unexplored)
+
+    def shot_medium(self, active: np.ndarray) -> np.ndarray:
+        unexplored = ~self.shots[active]
+        candidates = neighbours(self._open_hits(active)) & unexplored
+        hunting = ~candidates.any(axis=1)
+        candidates[hunting] = CHECKERBOARD_CELLS & unexplored[hunting]
+        empty = ~candidates.any(axis=1)
+        candidates[empty] = unexplored[empty]
+        return self._pick(np.zeros(candidates.shape), candidates)
+
+    def shot_hard(self, active: np.ndarray) -> np.ndarray:
+        shots = self.shots[active]
+        hits = self.hits[active]
+        sunk = self.sunk[active]
+        sunk_cells = (self.ships[active] & sunk[:, :, None]).any(axis=1)
+        blocked = ((shots & ~hits) | sunk_cells).astype(np.float32)
+        open_hits = (hits & ~sunk_cells).astype(np.float32)
+
+        density = np.zeros(shots.shape, dtype=np.float32)
+        for size, matrix in self.matrices.items():
+            copies = (~sunk[:, self.sizes == size]).sum(axis=1).astype(np.float32)
+            legal = (blocked @ matrix.T) == 0
+            through = open_hits @ matrix.T
+            weight = legal * np.where(through > 0, TARGET_WEIGHT * through, 1.0) * copies[:, None]
+            density += weight @ matrix
+
+        # Boards without any legal placement left fall back to random cells
+        return self._pick(density, ~shots)
+
+    def _open_hits(self, active: np.ndarray) -> np.ndarray:
+        sunk_cells = (self.ships[active] & self.sunk[active][:, :, None]).any(axis=1)
+        return self.hits[active] & ~sunk_cells
+
+    def play(self, strategy: str) -> np.ndarray:
+        """
+        Play every board to the end; returns the shots each board needed.
+        """
+        choose = getattr(self, f"shot_{strategy}")
+        while not self.done.all():
+            active = np.flatnonzero(~self.done)
+            self.fire(active, choose(active))
+        return self.shot_count
+
+
+def run_batch(job) -> np.ndarray:
+    strategy, boards, sizes, seed = job
+    return Batch(boards, sizes, np.random.default_rng(seed)).play(strategy)
+
+
+def simulate(strategy: str, games: int, batch_size: int, workers: int, sizes, seed: int = 0) -> np.ndarray:
+    """
+    Play `games` games and return the shots-to-win of each.
+    """
+    jobs = []
+    remaining = games
+    index = 0
+    while remaining > 0:
+        boards = min(batch_size, remaining)
+        jobs.append((strategy, boards, tuple(sizes), seed + index))
+        remaining -= boards
+        index += 1
+
+    if workers <= 1:
+        return np.concatenate([run_batch(job) for job in jobs])
+    with multiprocessing.Pool(workers) as pool:
+        return np.concatenate(list(pool.imap_unordered(run_batch, jobs)))
+
+
+def print_report(strategy: str, results: np.ndarray, elapsed: float) -> None:
+    print(f"strategy:        {strategy}")
+    print(f"games:           {len(results)}")
+    print(f"games/sec:       {len(results) / elapsed:.0f}")
+    print(f"shots to win:    mean {results.mean():.2f}, std {results.std():.2f}")
+    p = np.percentile(results, [0, 10, 50, 90, 100])
+    print(f"percentiles:     min {p[0]:.0f}, p10 {p[1]:.0f}, p50 {p[2]:.0f}, p90 {p[3]:.0f}, max {p[4]:.0f}")
+
+    # Text histogram in buckets of 5 shots
+    counts = np.bincount(results // 5, minlength=CELLS // 5 + 1)
+    peak = counts.max()
+    for bucket, count in enumerate(counts):
+        if count:
+            bar = "#" * max(1, int(40 * count / peak))
+            print(f"  {bucket * 5:>3}-{bucket * 5 + 4:<3} {count / len(results):>6.1%} {bar}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", choices=DIFFICULTIES, default="hard")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=2000, help="boards advanced in lockstep per task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes in the pool")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(FLEET_SIZES), help="ship sizes of the fleet")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = simulate(args.strategy, args.games, args.batch, args.workers, args.sizes, args.seed)
+    print_report(args.strategy, results, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
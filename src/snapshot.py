@@ -0,0 +1,204 @@
+"""
+Periodic snapshots of all live matches, for recovery after a restart.
+
+A background thread wakes up every few seconds, re-encodes only the
+matches whose `version` changed since the last pass (holding each match
+lock just long enough to copy a few integers), and writes the whole set
+to a temporary file that atomically replaces the previous snapshot. The
+move path only bumps the version counter.
+
+On startup the server restores the matches from the snapshot; players
+take their seats back by joining with the match id and the resume token
+from their "welcome", and computer players are seated again straight away.
+
+File layout: magic b"BSNP", match count, then per match a length-prefixed
+record:
+
+    "!IBB"  match id, seat whose turn it is (255 before the start),
+            ready bits
+    per seat:
+        kind (0 empty, 1 human, 2 + difficulty index for the AI),
+        name length and UTF-8 name,
+        "!Q" resume token (0 for none),
+        ship count and the first/last cell of every ship,
+        shots fired at the fleet as a 13-byte mask
+"""
+
+import os
+import struct
+import threading
+
+import log
+from ai import DIFFICULTIES
+from handlers import AIOpponent
+from journal import decode_fleet, encode_fleet
+from match import SEATS, Match
+from protocol import MASK_BYTES
+
+logger = log.get_logger("snapshot")
+
+MAGIC = b"BSNP"
+FILE_HEADER = struct.Struct("!4sI")
+MATCH_HEADER = struct.Struct("!IBB")
+LENGTH = struct.Struct("!I")
+TOKEN = struct.Struct("!Q")
+
+# Seconds between snapshots
+SNAPSHOT_INTERVAL = 2.0
+
+NO_TURN = 255
+SEAT_EMPTY = 0
+SEAT_HUMAN = 1
+SEAT_AI = 2
+
+
+def encode_match(match) -> bytes:
+    """
+    Encode one match; call with the match lock held.
+    """
+    turn = NO_TURN if match.current_turn is None else match.current_turn
+    ready = sum(1 << seat for seat in range(SEATS) if match.ready[seat])
+    body = bytearray(MATCH_HEADER.pack(match.match_id, turn, ready))
+
+    for seat in range(SEATS):
+        conn = match.seats[seat]
+        if conn is not None and conn.is_bot:
+            kind = SEAT_AI + DIFFICULTIES.index(conn.difficulty)
+        elif conn is not None or match.names[seat] is not None:
+            kind = SEAT_HUMAN
+        else:
+            kind = SEAT_EMPTY
+        name = (match.names[seat] or "").encode("utf-8")[:255]
+        body += bytes((kind, len(name))) + name
+        body += TOKEN.pack(match.tokens[seat] or 0)
+
+        fleet = match.fleets[seat]
+        if fleet is None:
+            body.append(0)
+            continue
+        body.append(len(fleet.ship_masks))
+        body += encode_fleet(fleet)
+        body += fleet.shots.to_bytes(MASK_BYTES, "big")
+    return bytes(body)
+
+
+def decode_match(data: bytes) -> Match:
+    match_id, turn, ready = MATCH_HEADER.unpack_from(data)
+    match = Match(match_id)
+    match.current_turn = None if turn == NO_TURN else turn
+    match.ready = [bool(ready >> seat & 1) for seat in range(SEATS)]
+
+    pos = MATCH_HEADER.size
+    for seat in range(SEATS):
+        kind, length = data[pos], data[pos + 1]
+        pos += 2
+        name = data[pos:pos + length].decode("utf-8", "replace")
+        pos += length
+        if kind != SEAT_EMPTY:
+            match.names[seat] = name
+        (token,) = TOKEN.unpack_from(data, pos)
+        pos += TOKEN.size
+        match.tokens[seat] = token or None
+
+        ships = data[pos]
+        pos += 1
+        if ships:
+            fleet = decode_fleet(data[pos:pos + 2 * ships])
+            pos += 2 * ships
+            fleet.shots = int.from_bytes(data[pos:pos + MASK_BYTES], "big")
+            fleet.hits = fleet.shots & fleet.occupied
+            pos += MASK_BYTES
+            match.fleets[seat] = fleet
+
+        if kind >= SEAT_AI:
+            bot = AIOpponent(DIFFICULTIES[kind - SEAT_AI])
+            if match.fleets[seat] is not None:
+                bot.fleet = match.fleets[seat]
+            match.seats[seat] = bot
+    return match
+
+
+def load(path: str) -> list:
+    """
+    Read the matches of a snapshot file; [] when there is none.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+
+    magic, count = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a match snapshot.")
+    matches = []
+    pos = FILE_HEADER.size
+    for _ in range(count):
+        (length,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        matches.append(decode_match(data[pos:pos + length]))
+        pos += length
+    return matches
+
+
+class Snapshotter:
+    """
+    Writes snapshots of a MatchRegistry from a background thread.
+    """
+
+    def __init__(self, registry, path: str, interval: float = SNAPSHOT_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+
+        # match id -> (version, encoded match) of the last snapshot
+        self._saved = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="snapshot", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.snapshot()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("snapshot_failed", path=self.path)
+
+    def snapshot(self) -> bool:
+        """
+        Write a snapshot if any match changed, started or ended since the
+        last one. Returns whether a file was written.
+        """
+        matches = self.registry.live()
+        changed = len(matches) != len(self._saved)
+        saved = {}
+        for match in matches:
+            previous = self._saved.get(match.match_id)
+            if previous is not None and previous[0] == match.version:
+                saved[match.match_id] = previous
+                continue
+            with match.lock:
+                saved[match.match_id] = (match.version, encode_match(match))
+            changed = True
+        self._saved = saved
+        if not changed:
+            return False
+
+        body = bytearray(FILE_HEADER.pack(MAGIC, len(saved)))
+        for _, data in saved.values():
+            body += LENGTH.pack(len(data)) + data
+
+        temp = self.path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+        return True
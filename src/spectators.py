@@ -0,0 +1,116 @@
+"""
+Fan-out of match events to spectators.
+
+A match may have hundreds of read-only watchers. Players never write to
+them: the move handler hands each public event to the SpectatorFeed with
+a single queue append (under the match lock, so events keep their order),
+and the feed delivers it later on its own thread, or as a callback on
+the event loop for the asyncio engine.
+
+Delivery encodes the event once per protocol version in use and writes
+the same frame bytes to every watcher with `try_send_frame`, which never
+blocks. A watcher whose connection cannot take a frame right away has
+fallen a whole socket buffer behind; it is disconnected instead of being
+waited for.
+"""
+
+import queue
+import threading
+
+import log
+from fleet import HIT, MISS, SINK, cell_to_coord, mask_cells
+from protocol import encode
+
+logger = log.get_logger("spectators")
+
+# Seat index sent in "welcome" to spectators
+SPECTATOR_SEAT = 255
+
+
+def encode_once(conns, payload: dict) -> dict:
+    """
+    Return {protocol: frame} for the protocols used by `conns`, encoding
+    the payload once per protocol instead of once per connection.
+    """
+    frames = {}
+    for conn in conns:
+        if conn is not None and conn.protocol not in frames:
+            frames[conn.protocol] = encode(payload, conn.protocol)
+    return frames
+
+
+def match_state(match) -> dict:
+    """
+    Everything a spectator needs to draw a match it starts watching:
+    names, whose turn it is and the shots fired by each seat. Call with
+    the match lock held.
+    """
+    shots = []
+    for seat in range(len(match.seats)):
+        fleet = match.fleets[match.opponent_of(seat)]
+        fired = {MISS: [], HIT: [], SINK: []}
+        if fleet is not None:
+            sunk = 0
+            for mask in fleet.sunk_ships():
+                sunk |= mask
+            fired[MISS] = [cell_to_coord(c) for c in mask_cells(fleet.shots & ~fleet.hits)]
+            fired[HIT] = [cell_to_coord(c) for c in mask_cells(fleet.hits & ~sunk)]
+            fired[SINK] = [cell_to_coord(c) for c in mask_cells(sunk)]
+        shots.append(fired)
+    return {
+        "type": "spectate_state",
+        "match": match.match_id,
+        "names": list(match.names),
+        "turn": match.current_turn,
+        "shots": shots,
+    }
+
+
+class SpectatorFeed:
+    """
+    Delivers events to spectators away from the players' handlers.
+
+    `schedule(callback, *args)` runs a delivery; the default queues it
+    for a background thread. The asyncio engine replaces it with
+    loop.call_soon_threadsafe, so transports are only touched by the loop.
+    """
+
+    def __init__(self):
+        self.schedule = self._enqueue
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, spectators, payload: dict) -> None:
+        """
+        Send `payload` to a tuple of spectator connections.
+        """
+        if spectators:
+            self.schedule(self.deliver, spectators, payload)
+
+    def deliver(self, spectators, payload: dict) -> None:
+        frames = encode_once(spectators, payload)
+        for conn in spectators:
+            try:
+                delivered = conn.try_send_frame(frames[conn.protocol])
+            except Exception:
+                delivered = False
+            if not delivered:
+                logger.info("spectator_dropped", addr=conn.addr)
+                conn.close()
+
+    def _enqueue(self, callback, *args) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="spectators", daemon=True)
+                    self._thread.start()
+        self._queue.put((callback, args))
+
+    def _run(self) -> None:
+        while True:
+            callback, args = self._queue.get()
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("spectator_delivery_failed")
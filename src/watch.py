@@ -0,0 +1,62 @@
+"""
+Watch a match from the terminal as a spectator.
+
+Prints the match state when it starts, then every shot and the winner.
+
+Usage:
+    python watch.py 3
+    python watch.py 3 --host 192.168.1.10
+"""
+
+import argparse
+import socket
+
+from client_core import HOST, PORT, ClientSession, SpectatorState
+from protocol import PROTOCOL_BINARY
+
+
+def describe(state: SpectatorState, message: dict) -> str:
+    msg_type = message.get("type")
+    if msg_type == "spectate_state":
+        names = " vs ".join(name or "(empty seat)" for name in state.names)
+        shots = ", ".join(f"{len(fired)} shots" for fired in state.shots)
+        turn = "-" if state.turn is None else state.names[state.turn]
+        return f"match {state.match_id}: {names} ({shots}), next turn: {turn}"
+    if msg_type == "spectate_move":
+        return f"{state.names[message['seat']]} fires at {message['coord']}: {message['status']}"
+    if msg_type == "gameover":
+        return f"{message['winner']} wins"
+    if msg_type == "error":
+        return f"error: {message['message']}"
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("match", type=int)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    state = SpectatorState()
+    session = ClientSession("spectator", PROTOCOL_BINARY, state)
+    with socket.create_connection((args.host, args.port)) as sock:
+        sock.sendall(session.spectate_message(args.match))
+        while not state.game_over and state.last_error is None:
+            data = sock.recv(4096)
+            if not data:
+                print("server closed the connection")
+                return
+            for message in session.receive(data):
+                if message.get("type") == "ping":
+                    sock.sendall(session.pong_message())
+                line = describe(state, message)
+                if line is not None:
+                    print(line)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass